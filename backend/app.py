@@ -1,11 +1,48 @@
 # backend/app.py
 
-from fastapi import FastAPI
+import time
+from uuid import uuid4
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from config import get_settings
+from resources import Resources, set_resources
+from utils.log import setup_logging, request_id_var
+from utils.metrics import http_request_seconds, render_metrics, db_round_trips_var
 from routes.test_routes import router as test_router
 from routes.hr_routes import router as hr_router
+from services.evaluation_queue import evaluation_queue
+from tasks.cleanup import cleanup_scheduler
 
-app = FastAPI()
+setup_logging(get_settings())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # DB client, pooled HTTP client and caches. Settings can be preset on app.state
+    # (e.g. by benchmarks) to run against stand-ins; otherwise they come from the env.
+    settings = getattr(app.state, "settings", None) or get_settings()
+    setup_logging(settings)
+    resources = Resources(settings)
+    set_resources(resources)
+    app.state.resources = resources
+    if settings.startup_warmup:
+        await resources.warm_up()
+    # Scores submissions in the background and re-enqueues any left unfinished
+    await evaluation_queue.start()
+    # Deletes expired questions, sets and old results in batches, on a jittered interval
+    cleanup_scheduler.start()
+    try:
+        yield
+    finally:
+        await cleanup_scheduler.stop()
+        await evaluation_queue.stop()
+        await resources.close()
+        set_resources(None)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # 🚨 CORS: Allow frontend to access API
 app.add_middleware(
@@ -16,9 +53,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def route_label(request: Request) -> str:
+    """Full route template, e.g. /api/test/{question_set_id}, so ids don't explode the series count"""
+    route = request.scope.get("route")
+    if route is None or not hasattr(route, "path_regex"):
+        return "unmatched"
+    # The template comes from the route itself, never from param values. Depending on the
+    # FastAPI version it may lack the include_router prefix, which is then the literal part
+    # of the path before the segment the route matches.
+    path = request.url.path
+    for i, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """
+    Assign a request id (or honour the caller's), record per-route latency and
+    report the number of Supabase round trips in X-DB-Queries
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid4().hex
+    token = request_id_var.set(request_id)
+    db_token = db_round_trips_var.set([0])
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        # Streaming responses send headers first, so this only counts queries made before the body starts
+        response.headers["X-DB-Queries"] = str(db_round_trips_var.get()[0])
+        return response
+    finally:
+        http_request_seconds.observe(time.perf_counter() - started, request.method, route_label(request), status)
+        db_round_trips_var.reset(db_token)
+        request_id_var.reset(token)
+
 app.include_router(test_router, prefix="/api/test")
 app.include_router(hr_router, prefix="/api/hr")
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"message": "HR Test Automation API is live 🚀"}
@@ -0,0 +1,118 @@
+"""
+Cold-start cost of one API worker: time to import the app, to run its
+startup (lifespan), and to answer a first request, plus peak memory.
+
+Each sample is a fresh interpreter, like a newly spawned uvicorn worker,
+pointed at the local PostgREST/OpenRouter stand-ins (no credentials needed).
+
+Usage (from backend/):
+    python benchmarks/cold_start.py [--runs 5] [--json cold_start.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS = ["import_ms", "startup_ms", "first_request_ms", "max_rss_mb"]
+
+
+def child(postgrest_port: int, openrouter_port: int, warmup: bool) -> dict:
+    """Runs in the fresh interpreter; everything the worker pays for is inside the timers"""
+    import asyncio
+    import resource
+
+    started = time.perf_counter()
+    import httpx
+    from app import app
+    imported = time.perf_counter()
+
+    # Same as load_test.stand_in_settings, without importing uvicorn and the fakes into the worker
+    from config import Settings
+    app.state.settings = Settings(
+        supabase_url=f"http://127.0.0.1:{postgrest_port}",
+        supabase_service_role_key="benchmark",
+        openrouter_url=f"http://127.0.0.1:{openrouter_port}/api/v1/chat/completions",
+        openrouter_api_key="benchmark",
+        startup_warmup=warmup,
+        log_level="WARNING",
+        cleanup_enabled=False
+    )
+
+    async def boot():
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                response = await client.get("/api/hr/tests", params={"limit": 10})
+                response.raise_for_status()
+            return ready, time.perf_counter()
+
+    ready, answered = asyncio.run(boot())
+    return {
+        "import_ms": round((imported - started) * 1000, 1),
+        "startup_ms": round((ready - imported) * 1000, 1),
+        "first_request_ms": round((answered - ready) * 1000, 1),
+        # ru_maxrss is KiB on Linux
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def sample(postgrest_port: int, openrouter_port: int, warmup: bool) -> dict:
+    env = {
+        "PATH": os.environ.get("PATH", ""),
+        "HOME": os.environ.get("HOME", ""),
+    }
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", str(postgrest_port), str(openrouter_port), "1" if warmup else "0"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        print(json.dumps(child(int(sys.argv[2]), int(sys.argv[3]), sys.argv[4] == "1")))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    from load_test import free_port, serve_in_thread
+    from fake_openrouter import create_fake_openrouter
+    from fake_postgrest import create_fake_postgrest
+
+    openrouter_port, postgrest_port = free_port(), free_port()
+    servers = [
+        serve_in_thread(create_fake_openrouter(latency=0.05, jitter=0), openrouter_port),
+        serve_in_thread(create_fake_postgrest(), postgrest_port),
+    ]
+
+    results = {}
+    for mode, warmup in (("lazy", False), ("warm-up", True)):
+        runs = [sample(postgrest_port, openrouter_port, warmup) for _ in range(args.runs)]
+        results[mode] = {metric: statistics.median(r[metric] for r in runs) for metric in METRICS}
+
+    for server in servers:
+        server.should_exit = True
+
+    print(f"\n{'mode':<9} {'import ms':>10} {'startup ms':>11} {'1st req ms':>11} {'max rss MB':>11}   (median of {args.runs})")
+    for mode, r in results.items():
+        print(f"{mode:<9} {r['import_ms']:>10.1f} {r['startup_ms']:>11.1f} {r['first_request_ms']:>11.1f} {r['max_rss_mb']:>11.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+In-process stand-in for the OpenRouter chat-completions API.
+
+Answers the prompts the backend actually sends with canned, well-formed
+output: question arrays for generation prompts (counts parsed from the
+prompt) and {"scores": [...]} for evaluation prompts. Latency, 5xx errors
+and 429s are injected at configurable rates.
+
+Run standalone:
+    python benchmarks/fake_openrouter.py --port 8801 --latency 0.8 --rate-429 0.05
+then start the backend with OPENROUTER_URL=http://127.0.0.1:8801/api/v1/chat/completions
+"""
+import re
+import json
+import random
+import asyncio
+import argparse
+import itertools
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_MIXED = re.compile(r"exactly (\d+) multiple choice questions and (\d+) coding", re.IGNORECASE)
+_CODING = re.compile(r"Generate (\d+) \w+ level coding questions", re.IGNORECASE)
+_MCQ = re.compile(r"Generate (\d+) \w+ level multiple choice", re.IGNORECASE)
+_EVAL_QUESTION = re.compile(r"^Q(\d+):", re.MULTILINE)
+
+
+def canned_questions(mcq_count: int, coding_count: int, serial: int) -> list:
+    questions = []
+    for i in range(mcq_count):
+        questions.append({
+            "question": f"Benchmark MCQ {serial}-{i}: which option is correct?",
+            "options": ["A) first", "B) second", "C) third", "D) fourth"],
+            "answer": "B) second"
+        })
+    for i in range(coding_count):
+        questions.append({
+            "question": f"Benchmark coding {serial}-{i}: read two integers and print their sum.",
+            "answer": "a, b = map(int, input().split())\nprint(a + b)",
+            "test_cases": [
+                {"input": "1 2", "expected_output": "3"},
+                {"input": "10 -4", "expected_output": "6"}
+            ]
+        })
+    return questions
+
+
+def canned_content(prompt: str, serial: int, rng: random.Random) -> str:
+    """Model output for one prompt, shaped like what the real models return"""
+    if '"scores"' in prompt:
+        numbers = [int(n) for n in _EVAL_QUESTION.findall(prompt)]
+        return json.dumps({"scores": [
+            {"q": n, "score": rng.randint(4, 10), "feedback": "Benchmark feedback."} for n in numbers
+        ]})
+
+    mixed = _MIXED.search(prompt)
+    if mixed:
+        mcq_count, coding_count = int(mixed.group(1)), int(mixed.group(2))
+    else:
+        coding = _CODING.search(prompt)
+        mcq = _MCQ.search(prompt)
+        mcq_count = int(mcq.group(1)) if mcq else 0
+        coding_count = int(coding.group(1)) if coding else 0
+    return json.dumps(canned_questions(mcq_count, coding_count, serial))
+
+
+def create_fake_openrouter(
+    latency: float = 0.5,
+    jitter: float = 0.2,
+    error_rate: float = 0.0,
+    rate_429: float = 0.0,
+    retry_after: float = 1.0,
+    seed: int = 7
+) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    serials = itertools.count()
+    app.state.stats = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0}
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        stats = app.state.stats
+        stats["requests"] += 1
+        body = await request.json()
+
+        if rng.random() < rate_429:
+            stats["throttled"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit exceeded"}},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)}
+            )
+
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Upstream error"}}, status_code=502)
+
+        prompt = body["messages"][-1]["content"]
+        content = canned_content(prompt, next(serials), rng)
+        stats["ok"] += 1
+
+        if body.get("stream"):
+            async def frames():
+                for start in range(0, len(content), 40):
+                    delta = {"choices": [{"delta": {"content": content[start:start + 40]}}]}
+                    yield f"data: {json.dumps(delta)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(frames(), media_type="text/event-stream")
+
+        return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+    @app.get("/stats")
+    async def get_stats():
+        return app.state.stats
+
+    return app
+
+
+def create_fake_jd_service(latency: float = 0.05) -> FastAPI:
+    """Stand-in for the JD service's summary endpoint (JOB_SUMMARY_API_URL)"""
+    app = FastAPI()
+
+    @app.get("/api/jd/get-jd-summary/{jd_id}")
+    async def get_jd_summary(jd_id: str):
+        await asyncio.sleep(latency)
+        return {"jobSummary": f"Benchmark role {jd_id}: Python backend developer with SQL and REST APIs."}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8801)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_fake_openrouter(args.latency, args.jitter, args.error_rate, args.rate_429),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning"
+    )
@@ -0,0 +1,259 @@
+"""
+In-memory stand-in for Supabase's PostgREST API, enough of it for the
+queries this backend makes: select with filters, embedded counts, ordering,
+limit and exact counts; insert, upsert, update, delete; and the
+test_results_summary RPC. Every request is counted so benchmarks can report
+DB round trips.
+
+Point the backend at it with SUPABASE_URL=http://127.0.0.1:<port> (any key works).
+"""
+import json
+import uuid
+import argparse
+import statistics
+from collections import defaultdict
+from datetime import datetime
+from fastapi import FastAPI, Request, Response
+
+# Column defaults the real schema fills in (see db/migrations)
+DEFAULTS = {
+    "test_results": {"attempts": 0, "evaluation_status": "done"},
+}
+
+
+def _as_timestamptz(data: dict) -> dict:
+    """*_at columns are timestamptz: naive ISO strings come back with an explicit UTC offset"""
+    out = dict(data)
+    for key, value in data.items():
+        if key.endswith("_at") and isinstance(value, str) and "T" in value and "+" not in value and not value.endswith("Z"):
+            out[key] = value + "+00:00"
+    return out
+
+
+def _split_top_level(text: str) -> list:
+    """Split on commas that are not inside parentheses or double quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    if current:
+        parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _compare(left, right: str):
+    """Compare a stored value with a filter literal, numerically when both look numeric"""
+    if left is None:
+        return None
+    try:
+        return (float(left) > float(right)) - (float(left) < float(right))
+    except (TypeError, ValueError):
+        left = str(left).lower() if isinstance(left, bool) else str(left)
+        return (left > right) - (left < right)
+
+
+def _matches(row: dict, column: str, expression: str) -> bool:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, value = expression.partition(".")
+    current = row.get(column)
+
+    if op == "is":
+        result = current is None if value == "null" else str(current).lower() == value
+    elif op == "in":
+        options = [_unquote(v) for v in _split_top_level(value.strip("()"))]
+        result = current is not None and str(current) in options
+    else:
+        cmp = _compare(current, _unquote(value))
+        result = cmp is not None and {
+            "eq": cmp == 0, "neq": cmp != 0, "lt": cmp < 0, "lte": cmp <= 0, "gt": cmp > 0, "gte": cmp >= 0
+        }.get(op, False)
+    return not result if negate else result
+
+
+def _logic(row: dict, operator: str, body: str) -> bool:
+    """Evaluate or=(...) / and=(...) groups, which may nest"""
+    results = []
+    for term in _split_top_level(body.strip()[1:-1]):
+        if term.startswith(("and(", "or(")):
+            name, _, rest = term.partition("(")
+            results.append(_logic(row, name, "(" + rest))
+        else:
+            column, _, expression = term.partition(".")
+            results.append(_matches(row, column, expression))
+    return any(results) if operator == "or" else all(results)
+
+
+class FakePostgrest:
+    def __init__(self):
+        self.tables: dict[str, list] = defaultdict(list)
+        self.round_trips = 0
+        self.by_operation: dict[str, int] = defaultdict(int)
+
+    def reset(self):
+        self.tables.clear()
+        self.round_trips = 0
+        self.by_operation.clear()
+
+    def filter_rows(self, table: str, params: list) -> list:
+        rows = self.tables[table]
+        for key, value in params:
+            if key in ("select", "order", "limit", "offset", "columns", "on_conflict"):
+                continue
+            if key in ("or", "and"):
+                rows = [r for r in rows if _logic(r, key, value)]
+            else:
+                rows = [r for r in rows if _matches(r, key, value)]
+        return rows
+
+    def project(self, table: str, rows: list, select: str) -> list:
+        fields = _split_top_level(select or "*")
+        parent_key = f"{table.rstrip('s')}_id"
+        out = []
+        for row in rows:
+            item = {}
+            for field in fields:
+                if field == "*":
+                    item.update(row)
+                elif field.endswith("(count)"):
+                    relation = field[:-len("(count)")]
+                    count = sum(1 for child in self.tables[relation] if child.get(parent_key) == row.get("id"))
+                    item[relation] = [{"count": count}]
+                else:
+                    item[field] = row.get(field)
+            out.append(item)
+        return out
+
+    def insert(self, table: str, payload, upsert_on: str | None, ignore_duplicates: bool = False) -> list:
+        now = datetime.utcnow().isoformat()
+        written = []
+        for data in payload if isinstance(payload, list) else [payload]:
+            data = _as_timestamptz(data)
+            row = {"id": str(uuid.uuid4()), "created_at": now + "+00:00", **DEFAULTS.get(table, {}), **data}
+            existing = None
+            if upsert_on and row.get(upsert_on) is not None:
+                existing = next((r for r in self.tables[table] if r.get(upsert_on) == row.get(upsert_on)), None)
+            if existing is not None:
+                if not ignore_duplicates:
+                    existing.update(data)
+                    written.append(existing)
+            else:
+                self.tables[table].append(row)
+                written.append(row)
+        return written
+
+    def summary(self, question_set_id: str) -> dict:
+        results = [r for r in self.tables["test_results"] if r.get("question_set_id") == question_set_id]
+        scored = [r for r in results if r.get("evaluation_status") == "done"]
+        scores = sorted(r.get("score") or 0 for r in scored)
+        sets = [s for s in self.tables["question_sets"] if s.get("id") == question_set_id]
+        times = [r["duration_used_minutes"] for r in results if r.get("duration_used_minutes") is not None]
+        histogram = [0] * 10
+        for r in scored:
+            histogram[min(9, int((r.get("percentage") or 0) // 10))] += 1
+        return {
+            "test_duration": sets[0].get("duration") if sets else None,
+            "total_submissions": len(results),
+            "pending_submissions": sum(1 for r in results if r.get("evaluation_status") in ("pending", "running")),
+            "scored_submissions": len(scored),
+            "average_score": statistics.mean(scores) if scores else None,
+            "median_score": statistics.median(scores) if scores else None,
+            "p90_score": statistics.quantiles(scores, n=10)[-1] if len(scores) > 1 else (scores[0] if scores else None),
+            "average_percentage": statistics.mean(r.get("percentage") or 0 for r in scored) if scored else None,
+            "pass_rate": sum(1 for r in scored if r.get("status") == "Pass") / len(scored) if scored else None,
+            "average_time_used": statistics.mean(times) if times else None,
+            "score_histogram": [{"range": f"{i * 10}-{i * 10 + 10}%", "count": n} for i, n in enumerate(histogram)],
+        }
+
+
+def create_fake_postgrest(store: FakePostgrest | None = None) -> FastAPI:
+    store = store or FakePostgrest()
+    app = FastAPI()
+    app.state.store = store
+
+    def json_response(data, status: int = 200, total: int | None = None) -> Response:
+        headers = {}
+        if total is not None:
+            headers["Content-Range"] = f"0-{max(0, len(data) - 1)}/{total}"
+        return Response(json.dumps(data, default=str), status_code=status, media_type="application/json", headers=headers)
+
+    @app.post("/rest/v1/rpc/{name}")
+    async def rpc(name: str, request: Request):
+        store.round_trips += 1
+        store.by_operation[f"rpc:{name}"] += 1
+        params = await request.json()
+        if name == "test_results_summary":
+            return json_response(store.summary(params.get("p_question_set_id")))
+        return json_response({"message": f"function {name} not found"}, status=404)
+
+    @app.api_route("/rest/v1/{table}", methods=["GET", "POST", "PATCH", "DELETE"])
+    async def table_route(table: str, request: Request):
+        store.round_trips += 1
+        store.by_operation[f"{request.method}:{table}"] += 1
+        params = list(request.query_params.multi_items())
+        query = dict(params)
+        prefer = request.headers.get("prefer", "")
+
+        if request.method == "POST":
+            upsert = "merge-duplicates" in prefer or "ignore-duplicates" in prefer
+            written = store.insert(
+                table,
+                await request.json(),
+                query.get("on_conflict") if upsert else None,
+                ignore_duplicates="ignore-duplicates" in prefer
+            )
+            return json_response(written, status=201)
+
+        rows = store.filter_rows(table, params)
+
+        if request.method == "PATCH":
+            changes = _as_timestamptz(await request.json())
+            for row in rows:
+                row.update(changes)
+            return json_response(rows)
+
+        if request.method == "DELETE":
+            doomed = {id(r) for r in rows}
+            store.tables[table] = [r for r in store.tables[table] if id(r) not in doomed]
+            return json_response(rows)
+
+        for clause in reversed(query.get("order", "").split(",") if query.get("order") else []):
+            column, _, direction = clause.partition(".")
+            rows = sorted(rows, key=lambda r: (r.get(column) is None, str(r.get(column))), reverse=direction.startswith("desc"))
+        total = len(rows)
+        if "limit" in query:
+            rows = rows[int(query.get("offset", 0)):int(query.get("offset", 0)) + int(query["limit"])]
+        return json_response(store.project(table, rows, query.get("select")), total=total if "count=" in prefer else None)
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "round_trips": store.round_trips,
+            "by_operation": dict(store.by_operation),
+            "rows": {name: len(rows) for name, rows in store.tables.items()}
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8802)
+    args = parser.parse_args()
+    uvicorn.run(create_fake_postgrest(), host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,301 @@
+"""
+Load test for the backend API against local stand-ins for OpenRouter and
+Supabase (benchmarks/fake_openrouter.py, benchmarks/fake_postgrest.py).
+
+The fakes run as real HTTP servers on ephemeral ports; the app runs
+in-process (with its lifespan, so the evaluation queue is live) and is
+driven through an ASGI transport at the target concurrency.
+
+Usage (from backend/):
+    python benchmarks/load_test.py [--scenarios generate,finalize,list,fetch,submit,resubmit,export,campaign]
+        [--concurrency 20] [--requests 200] [--llm-latency 0.5] [--llm-error-rate 0]
+        [--llm-429-rate 0] [--campaign-size 10] [--json results.json] [--compare baseline.json]
+
+Reports per scenario: throughput, latency percentiles, error count and
+Supabase round trips per request (from the X-DB-Queries response header).
+Save a run with --json and pass it to --compare on the next run to diff.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import uvicorn
+from fake_openrouter import create_fake_openrouter, create_fake_jd_service, canned_questions
+from fake_postgrest import create_fake_postgrest, FakePostgrest
+
+SCENARIOS = ["generate", "finalize", "list", "fetch", "submit", "resubmit", "export", "campaign"]
+# Opt-in: each campaign request generates a whole batch of tests
+DEFAULT_SCENARIOS = [s for s in SCENARIOS if s != "campaign"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(app, port: int) -> uvicorn.Server:
+    """Run an ASGI app on its own thread and event loop so it doesn't share the app's loop"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def stand_in_settings(postgrest_port: int, openrouter_port: int, jd_service_port: int | None = None, **overrides):
+    """Settings pointing the app at the local fakes"""
+    from config import Settings
+    if jd_service_port:
+        overrides["job_summary_api_url"] = f"http://127.0.0.1:{jd_service_port}/api/jd/get-jd-summary"
+    return Settings(
+        supabase_url=f"http://127.0.0.1:{postgrest_port}",
+        supabase_service_role_key="benchmark",
+        openrouter_url=f"http://127.0.0.1:{openrouter_port}/api/v1/chat/completions",
+        openrouter_api_key="benchmark",
+        **overrides
+    )
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, make_request, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, db_queries, errors = [], [], 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+            except Exception as e:
+                errors += 1
+                print(f"❌ {name} #{i}: {e}")
+                return
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+            if "x-db-queries" in response.headers:
+                db_queries.append(int(response.headers["x-db-queries"]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round((latencies[-1] if latencies else 0) * 1000, 1),
+        "db_queries_per_request": round(statistics.mean(db_queries), 2) if db_queries else None,
+    }
+
+
+def build_scenarios(seeded_tests: list, questions: list, campaign_size: int) -> dict:
+    async def generate(client, i):
+        return await client.post("/api/hr/generate-test", json={
+            "topic": "Python backend developer",
+            "difficulty": "medium",
+            "num_questions": 10,
+            "question_type": "mixed",
+            "mcq_count": 5,
+            "coding_count": 5,
+        })
+
+    async def finalize(client, i):
+        return await client.post("/api/hr/finalize-test", json={
+            "questions": canned_questions(5, 5, serial=100000 + i),
+            "duration": 30,
+            "jd_id": "bench-jd",
+        })
+
+    async def list_tests(client, i):
+        return await client.get("/api/hr/tests", params={"limit": 50})
+
+    async def fetch(client, i):
+        return await client.get(f"/api/test/{seeded_tests[i % len(seeded_tests)]}")
+
+    def submission(i):
+        answers = [q.get("answer", "") if i % 2 else "A) first" for q in questions]
+        return {
+            "question_set_id": seeded_tests[i % len(seeded_tests)],
+            "questions": [{"question": q["question"], "options": q.get("options")} for q in questions],
+            "answers": answers,
+            "duration_used": 600,
+        }
+
+    async def submit(client, i):
+        # One key per submission, as the frontend sends
+        return await client.post("/api/test/submit", json=submission(i), headers={"Idempotency-Key": f"bench-{i}"})
+
+    async def resubmit(client, i):
+        # Double-clicks and retries: five distinct submissions, the rest are replays
+        return await client.post("/api/test/submit", json=submission(i % 5), headers={"Idempotency-Key": f"bench-resubmit-{i % 5}"})
+
+    async def export(client, i):
+        response = await client.get(
+            f"/api/hr/tests/{seeded_tests[i % len(seeded_tests)]}/results/export",
+            params={"format": "csv", "gzip": i % 2 == 1}
+        )
+        return response
+
+    async def campaign(client, i):
+        return await client.post("/api/hr/campaigns", json={
+            "jd_ids": [f"bench-campaign-{i}-{n}" for n in range(campaign_size)],
+            "difficulty": "medium",
+            "num_questions": 10,
+            "question_type": "mixed",
+            "mcq_count": 5,
+            "coding_count": 5,
+            "fresh": True,
+        })
+
+    return {
+        "generate": generate, "finalize": finalize, "list": list_tests,
+        "fetch": fetch, "submit": submit, "resubmit": resubmit, "export": export, "campaign": campaign
+    }
+
+
+async def wait_for_evaluations(store: FakePostgrest, timeout: float = 300) -> float:
+    """Seconds until the background queue has scored every stored submission"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        pending = [
+            r for r in store.tables["test_results"]
+            if r.get("evaluation_status") in ("pending", "running")
+        ]
+        if not pending:
+            break
+        await asyncio.sleep(0.1)
+    return time.perf_counter() - started
+
+
+def print_report(results: dict, baseline: dict | None):
+    header = f"{'scenario':<10} {'rps':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7} {'db/req':>7}"
+    print("\n" + header)
+    print("-" * len(header))
+    for name, r in results["scenarios"].items():
+        db = "-" if r["db_queries_per_request"] is None else f"{r['db_queries_per_request']:.2f}"
+        print(f"{name:<10} {r['throughput_rps']:>8.1f} {r['p50_ms']:>9.1f} {r['p90_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f} {r['errors']:>7} {db:>7}")
+        before = (baseline or {}).get("scenarios", {}).get(name)
+        if before:
+            def delta(key):
+                return f"{(r[key] - before[key]) / before[key] * 100:+.0f}%" if before[key] else "n/a"
+            print(f"{'  vs base':<10} {delta('throughput_rps'):>8} {delta('p50_ms'):>9} {delta('p90_ms'):>9} {delta('p99_ms'):>9} {delta('max_ms'):>9}")
+    if "evaluation_drain_seconds" in results:
+        print(f"\n⏱️ Background evaluation of all submissions finished {results['evaluation_drain_seconds']:.2f}s after the last submit")
+    print(f"🗄️ Supabase round trips: {results['supabase']['round_trips']}  |  🤖 OpenRouter: {results['openrouter']}")
+
+
+async def main_async(args):
+    store = FakePostgrest()
+    openrouter_app = create_fake_openrouter(
+        latency=args.llm_latency,
+        jitter=args.llm_latency / 4,
+        error_rate=args.llm_error_rate,
+        rate_429=args.llm_429_rate,
+    )
+    openrouter_port, postgrest_port, jd_service_port = free_port(), free_port(), free_port()
+    servers = [
+        serve_in_thread(openrouter_app, openrouter_port),
+        serve_in_thread(create_fake_postgrest(store), postgrest_port),
+        serve_in_thread(create_fake_jd_service(), jd_service_port),
+    ]
+
+    overrides = {"cleanup_enabled": False, "log_level": os.environ.get("LOG_LEVEL", "WARNING")}
+    if not args.provider_limits:
+        # Measure the backend, not the free-tier pacing
+        overrides.update(
+            openrouter_rate_per_minute=100000,
+            openrouter_burst=1000,
+            openrouter_max_in_flight=1000,
+            openrouter_queue_limit=100000
+        )
+    from app import app
+
+    # Connections and tuning knobs go through the lifespan's resource container
+    app.state.settings = stand_in_settings(postgrest_port, openrouter_port, jd_service_port, **overrides)
+
+    results = {"config": vars(args), "scenarios": {}}
+    async with app.router.lifespan_context(app):
+        # App errors come back as 500s and count as errors instead of aborting the run
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            # A few finalized tests for the fetch/submit/list scenarios
+            questions = canned_questions(5, 5, serial=0)
+            seeded = []
+            for i in range(5):
+                res = await client.post("/api/hr/finalize-test", json={"questions": canned_questions(5, 5, serial=i), "jd_id": "bench-seed"})
+                seeded.append(res.json()["test_link"].rsplit("/", 1)[-1])
+            scenarios = build_scenarios(seeded, questions, args.campaign_size)
+
+            for name in args.scenarios:
+                print(f"🚀 {name}: {args.requests} requests at concurrency {args.concurrency}")
+                store_before = store.round_trips
+                results["scenarios"][name] = await run_scenario(client, name, scenarios[name], args.requests, args.concurrency)
+                results["scenarios"][name]["supabase_round_trips"] = store.round_trips - store_before
+                if name in ("submit", "resubmit"):
+                    results["evaluation_drain_seconds"] = round(await wait_for_evaluations(store), 3)
+
+    results["supabase"] = {"round_trips": store.round_trips, "by_operation": dict(store.by_operation)}
+    results["openrouter"] = dict(openrouter_app.state.stats)
+    for server in servers:
+        server.should_exit = True
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_SCENARIOS), help="comma-separated subset of " + ",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mean fake OpenRouter latency in seconds")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--campaign-size", type=int, default=10, help="JDs per request in the campaign scenario")
+    parser.add_argument("--provider-limits", action="store_true", help="keep the app's OpenRouter rate limits instead of lifting them")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results file from an earlier --json run")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(main_async(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Throughput and accuracy check for services.score_parser against recorded
+model outputs (benchmarks/data/recorded_score_responses.jsonl).
+
+Usage (from backend/):
+    python benchmarks/score_parser_bench.py [--iterations 2000]
+
+Exits non-zero if any recorded response parses differently than expected,
+so it doubles as a regression suite when the parser or prompt changes.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.score_parser import parse_scores
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "recorded_score_responses.jsonl")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check(record: dict) -> list:
+    """Return a list of mismatches between the parser output and the recorded expectation"""
+    result = parse_scores(record["content"], record["question_numbers"])
+    expected = record["expected"]
+    scores = {str(q): s for q, s in result["scores"].items()}
+    problems = []
+    if result["strategy"] != expected["strategy"]:
+        problems.append(f"strategy {result['strategy']!r} != {expected['strategy']!r}")
+    if result["total"] != expected["total"]:
+        problems.append(f"total {result['total']} != {expected['total']}")
+    if scores != expected["scores"]:
+        problems.append(f"scores {scores} != {expected['scores']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="passes over the corpus for the timing run")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+
+    failures = 0
+    for record in corpus:
+        problems = check(record)
+        if problems:
+            failures += 1
+            print(f"❌ {record['name']}: " + "; ".join(problems))
+    accuracy = (len(corpus) - failures) / len(corpus) * 100
+    print(f"📊 Accuracy: {len(corpus) - failures}/{len(corpus)} ({accuracy:.1f}%)")
+
+    print(f"⏱️ Timing {args.iterations} passes over {len(corpus)} responses")
+    slowest = []
+    for record in corpus:
+        start = time.perf_counter()
+        for _ in range(max(1, args.iterations // 10)):
+            parse_scores(record["content"], record["question_numbers"])
+        per_call = (time.perf_counter() - start) / max(1, args.iterations // 10)
+        slowest.append((per_call, record["name"]))
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for record in corpus:
+            parse_scores(record["content"], record["question_numbers"])
+    elapsed = time.perf_counter() - start
+    parses = args.iterations * len(corpus)
+    print(f"🚀 Throughput: {parses / elapsed:,.0f} parses/s ({elapsed / parses * 1e6:.1f} µs mean)")
+    for per_call, name in sorted(slowest, reverse=True)[:3]:
+        print(f"   slowest: {name:<36} {per_call * 1e6:,.1f} µs")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+from functools import lru_cache
+from dataclasses import dataclass, field, fields
+from dotenv import load_dotenv
+
+# The one place .env is read; Settings.from_env sees it
+load_dotenv()
+
+
+def env_str(name: str, default: str | None = None) -> str | None:
+    value = os.getenv(name)
+    return default if value is None or value == "" else value
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Connection and resource settings. Built once per process by get_settings(),
+    or directly (e.g. Settings(supabase_url=...)) to run the app against stand-ins.
+    """
+    supabase_url: str | None = None
+    supabase_service_role_key: str | None = None
+    openrouter_url: str = "https://openrouter.ai/api/v1/chat/completions"
+    openrouter_api_key: str | None = None
+    # JD service endpoint; the jd_id is appended
+    job_summary_api_url: str = "http://localhost:5000/api/jd/get-jd-summary"
+
+    # The supabase client is synchronous; queries run on a bounded thread pool
+    db_max_workers: int = 16
+    db_timeout: float = 10
+
+    # Pool and timeouts for the shared outbound HTTP client (OpenRouter, JD service)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30
+    http_connect_timeout: float = 5
+    http_read_timeout: float = 60
+    http_write_timeout: float = 10
+    http_pool_timeout: float = 5
+
+    # Question sets are immutable once finalized, so candidate fetches are served from memory
+    test_cache_maxsize: int = 512
+    test_cache_ttl: float = 300
+    # Job summaries rarely change; failures are cached only for the negative TTL
+    job_summary_cache_maxsize: int = 1024
+    job_summary_cache_ttl: float = 3600
+    job_summary_negative_ttl: float = 30
+    # Per-question model scores, in front of the evaluation_cache table
+    evaluation_cache_maxsize: int = 4096
+    evaluation_cache_ttl: float = 3600
+
+    # Open DB and OpenRouter connections during startup instead of on the first request
+    startup_warmup: bool = False
+    warmup_timeout: float = 5
+
+    # Logging: "json" or "text"; raw model output and response bodies only at DEBUG with log_payloads
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_payloads: bool = False
+
+    # Per-model admission control. Free-tier models allow ~20 requests/minute, so by
+    # default calls are paced to that rate instead of being fired all at once.
+    openrouter_rate_per_minute: float = 20
+    openrouter_burst: int = 5
+    openrouter_max_in_flight: int = 8
+    # Callers beyond this many waiting per model are rejected immediately
+    openrouter_queue_limit: int = 100
+    # How long a call may wait for a slot (including 429 back-off) before it is rejected
+    openrouter_queue_timeout: float = 30
+    openrouter_max_retries: int = 2
+    openrouter_retry_base: float = 2
+
+    # Ordered by preference (comma-separated in the env); the first valid response wins
+    openrouter_models: tuple[str, ...] = ("qwen/qwen3-coder:free", "mistralai/mistral-7b-instruct:free")
+    # Start the next model if the current one hasn't answered after this many seconds (<= 0 disables hedging)
+    model_hedge_delay: float = 8
+    model_breaker_failures: int = 3
+    model_breaker_reset_seconds: float = 60
+
+    # Extra questions (as a fraction of the shortfall) generated on a bank miss and banked
+    # for later regenerates. 0 turns the question bank off entirely (no bank lookups); e.g. 1.0
+    # serves every other regenerate from the bank at the cost of twice the generation calls on a miss
+    question_bank_prefetch: float = 0
+    generation_chunk_size: int = 10
+    generation_concurrency: int = 4
+    generation_chunk_retries: int = 1
+    job_summary_timeout: float = 5
+
+    # Coding answers: points (out of 10) for passing test cases; the rest is model-judged quality
+    code_correctness_points: int = 7
+    # Model-graded questions are scored in batches that fit these budgets
+    evaluation_batch_token_budget: int = 6000
+    evaluation_batch_max_questions: int = 10
+    evaluation_batch_concurrency: int = 4
+    evaluation_output_tokens_per_question: int = 80
+    evaluation_max_output_tokens: int = 2000
+    # Follow-up requests for questions a batch reply left unscored; any still missing make the evaluation retryable
+    evaluation_rescore_rounds: int = 1
+    # Longer answers are cut ("head_tail" or "head") before they are sent to the model
+    evaluation_answer_max_tokens: int = 1500
+    evaluation_truncation_policy: str = "head_tail"
+    # Also keep per-question scores in the evaluation_cache table, not just in memory
+    evaluation_cache_persist: bool = True
+
+    # Background scoring of stored submissions
+    evaluation_workers: int = 4
+    evaluation_queue_size: int = 1000
+    evaluation_max_attempts: int = 3
+    evaluation_retry_delay: float = 5
+    # A 'running' row whose claim is older than this is assumed orphaned and re-enqueued by
+    # the recovery sweep, which runs at this interval too
+    evaluation_lease_seconds: float = 300
+
+    # Sandbox for coding answers
+    code_runner_workers: int = field(default_factory=lambda: os.cpu_count() or 2)
+    code_runner_cpu_seconds: int = 2
+    code_runner_wall_seconds: float = 5
+    code_runner_memory_mb: int = 256
+    code_runner_output_bytes: int = 65536
+    # RLIMIT_NPROC inside the sandbox (threads count too; node alone starts about ten)
+    code_runner_max_processes: int = 64
+    # Size of the private, writable temp dir each run gets
+    code_runner_tmpfs_mb: int = 16
+    # Covered with an empty tmpfs inside the sandbox, in addition to the backend directory
+    code_runner_hidden_paths: tuple[str, ...] = ()
+
+    campaign_concurrency: int = 10
+    campaign_max_jds: int = 50
+
+    export_page_size: int = 500
+    # Streamed exports are flushed in chunks of about this size
+    export_chunk_bytes: int = 64 * 1024
+
+    cleanup_enabled: bool = True
+    cleanup_interval_seconds: float = 3600
+    # Each worker waits a random 0..jitter seconds before every run so they don't all delete at once
+    cleanup_jitter_seconds: float = 300
+    cleanup_batch_size: int = 500
+    # Cap per table per run so one pass never holds the DB for long; the rest waits for the next run
+    cleanup_max_batches: int = 20
+    # Questions outlive their set's expiry briefly so late submissions can still be graded
+    questions_grace_hours: float = 24
+    # Submissions (and the expired sets they belong to) are kept this long; <= 0 keeps them forever
+    results_retention_days: float = 90
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Every field can be set by its upper-cased name, e.g. DB_TIMEOUT=5 or OPENROUTER_MODELS=a,b"""
+        values = {}
+        for f in fields(cls):
+            raw = env_str(f.name.upper())
+            if raw is not None:
+                values[f.name] = _parse(raw, f.type)
+        return cls(**values)
+
+
+def _parse(raw: str, kind):
+    if kind is bool:
+        return raw.lower() == "true"
+    if kind is int:
+        return int(raw)
+    if kind is float:
+        return float(raw)
+    if kind == tuple[str, ...]:
+        return tuple(item.strip() for item in raw.split(",") if item.strip())
+    return raw
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings.from_env()
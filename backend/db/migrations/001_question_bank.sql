@@ -0,0 +1,17 @@
+-- Question bank backing the generate-test cache (services/question_bank.py).
+-- Rows are keyed by a hash of the resolved job summary, difficulty and kind;
+-- served_at is set once a question has been handed to HR.
+create table if not exists question_bank (
+    id uuid primary key default gen_random_uuid(),
+    bank_key text not null,
+    kind text not null check (kind in ('mcq', 'coding')),
+    question text not null,
+    options jsonb,
+    answer text,
+    created_at timestamptz not null default now(),
+    served_at timestamptz
+);
+
+create index if not exists question_bank_unserved_idx
+    on question_bank (bank_key, created_at)
+    where served_at is null;
@@ -0,0 +1,15 @@
+-- Asynchronous evaluation pipeline (services/evaluation_queue.py).
+-- Submissions are stored raw with evaluation_status = 'pending' and scored
+-- by the in-process worker pool; existing rows are already evaluated.
+alter table test_results
+    add column if not exists evaluation_status text not null default 'done'
+        check (evaluation_status in ('pending', 'running', 'done', 'failed')),
+    add column if not exists submission jsonb,
+    add column if not exists attempts integer not null default 0,
+    add column if not exists claimed_at timestamptz,
+    add column if not exists evaluated_at timestamptz,
+    add column if not exists last_error text;
+
+create index if not exists test_results_unfinished_idx
+    on test_results (created_at)
+    where evaluation_status in ('pending', 'running');
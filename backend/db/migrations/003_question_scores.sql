@@ -0,0 +1,3 @@
+-- Per-question scores from the structured evaluator output ({"1": 10, "2": 6, ...}).
+alter table test_results
+    add column if not exists question_scores jsonb;
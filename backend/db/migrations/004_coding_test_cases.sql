@@ -0,0 +1,7 @@
+-- stdin/stdout test cases for coding questions, run by services/code_runner.py.
+-- Shape: [{"input": "...", "expected_output": "..."}]
+alter table questions
+    add column if not exists test_cases jsonb;
+
+alter table question_bank
+    add column if not exists test_cases jsonb;
@@ -0,0 +1,9 @@
+-- Per-question model scores keyed by a hash of the question, its options and the
+-- normalized answer (services/evaluation_cache.py). Shared by every worker so an
+-- identical answer is only sent to the model once.
+create table if not exists evaluation_cache (
+    cache_key text primary key,
+    score integer not null check (score between 0 and 10),
+    feedback text,
+    created_at timestamptz not null default now()
+);
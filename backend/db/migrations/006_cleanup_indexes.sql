@@ -0,0 +1,7 @@
+-- Indexes for the batched expiry cleanup (tasks/cleanup.py), which selects
+-- ids by expiry/age and deletes children by question_set_id.
+create index if not exists questions_expires_at_idx on questions (expires_at);
+create index if not exists questions_question_set_id_idx on questions (question_set_id);
+create index if not exists question_sets_expires_at_idx on question_sets (expires_at);
+create index if not exists test_results_created_at_idx on test_results (created_at);
+create index if not exists test_results_question_set_id_idx on test_results (question_set_id);
@@ -0,0 +1,53 @@
+-- Aggregates for GET /api/hr/tests/{id}/results, computed in the database so the
+-- summary is one small response regardless of how many submissions a test has.
+-- Score statistics only cover submissions whose evaluation is done.
+create or replace function test_results_summary(p_question_set_id uuid)
+returns jsonb
+language sql
+stable
+as $$
+    with scored as (
+        select score, percentage, status
+        from test_results
+        where question_set_id = p_question_set_id
+          and evaluation_status = 'done'
+    ),
+    buckets as (
+        -- 10 buckets of 10 percentage points; 100% lands in the last one
+        select least(greatest(width_bucket(percentage, 0, 100, 10), 1), 10) as bucket, count(*) as n
+        from scored
+        group by 1
+    )
+    select jsonb_build_object(
+        'test_duration', (select duration from question_sets where id = p_question_set_id),
+        'total_submissions', (select count(*) from test_results where question_set_id = p_question_set_id),
+        'pending_submissions', (
+            select count(*) from test_results
+            where question_set_id = p_question_set_id
+              and evaluation_status in ('pending', 'running')
+        ),
+        'scored_submissions', (select count(*) from scored),
+        'average_score', (select avg(score) from scored),
+        'median_score', (select percentile_cont(0.5) within group (order by score) from scored),
+        'p90_score', (select percentile_cont(0.9) within group (order by score) from scored),
+        'average_percentage', (select avg(percentage) from scored),
+        'pass_rate', (select avg(case when status = 'Pass' then 1.0 else 0.0 end) from scored),
+        'average_time_used', (
+            select avg(duration_used_minutes) from test_results
+            where question_set_id = p_question_set_id
+              and duration_used_minutes is not null
+        ),
+        'score_histogram', (
+            select coalesce(jsonb_agg(jsonb_build_object(
+                'range', format('%s-%s%%', (b - 1) * 10, b * 10),
+                'count', coalesce(buckets.n, 0)
+            ) order by b), '[]'::jsonb)
+            from generate_series(1, 10) as b
+            left join buckets on buckets.bucket = b
+        )
+    );
+$$;
+
+-- Keyset pagination over a test's submissions, newest first
+create index if not exists test_results_set_created_idx
+    on test_results (question_set_id, created_at desc, id desc);
@@ -0,0 +1,10 @@
+-- Idempotent submissions (services/submissions.py). Each submission carries a key,
+-- either from the client's Idempotency-Key header or a hash of its content.
+-- The unique index makes a repeated submit return the stored row, so a
+-- double-click or retry never creates a second row or a second model evaluation.
+-- Rows from before this migration keep a NULL key; NULLs never conflict.
+alter table test_results
+    add column if not exists idempotency_key text;
+
+create unique index if not exists test_results_idempotency_key_key
+    on test_results (idempotency_key);
@@ -0,0 +1,4 @@
+-- Keyset pagination for GET /api/hr/results/export: all tests' submissions in a
+-- created_at range, oldest first. Per-test exports use test_results_set_created_idx (007).
+create index if not exists test_results_created_id_idx
+    on test_results (created_at, id);
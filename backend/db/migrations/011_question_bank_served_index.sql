@@ -0,0 +1,5 @@
+-- The expiry cleanup (tasks/cleanup.py) deletes banked questions once they have
+-- been served; take_questions only reads unserved rows (question_bank_unserved_idx).
+create index if not exists question_bank_served_idx
+    on question_bank (served_at)
+    where served_at is not null;
@@ -0,0 +1,3 @@
+-- Keyset pagination for GET /api/hr/tests: newest first by (created_at, id).
+create index if not exists question_sets_created_id_idx
+    on question_sets (created_at desc, id desc);
@@ -1,15 +1,41 @@
-import os
-from supabase import create_client
-from dotenv import load_dotenv
+import time
+import asyncio
+from resources import get_resources
+from utils.metrics import db_query_seconds, count_db_round_trip
 
-load_dotenv()
-
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase = create_client(url, key)
+# PostgREST verb -> operation label for the latency histogram
+_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
 
 def get_supabase_client():
     """
-    Returns the Supabase client instance
+    Returns the Supabase client of the current resource container (built on first use)
+    """
+    return get_resources().supabase
+
+def describe_query(query) -> tuple:
+    """(table, operation) of a query builder, e.g. ("questions", "select") or ("test_results_summary", "rpc")"""
+    request = getattr(query, "request", None)
+    path = str(getattr(request, "path", ""))
+    method = getattr(request, "http_method", "")
+    method = str(getattr(method, "value", method)).upper()
+    resource = path.rsplit("/rest/v1/", 1)[-1] if "/rest/v1/" in path else "unknown"
+    if resource.startswith("rpc/"):
+        return resource[4:], "rpc"
+    return resource, _OPERATIONS.get(method, "unknown")
+
+async def run_query(query, timeout: float | None = None):
+    """
+    Execute a Supabase query builder off the event loop, on the container's DB thread pool.
+    Raises asyncio.TimeoutError if the round trip exceeds `timeout` (default settings.db_timeout).
     """
-    return supabase
\ No newline at end of file
+    resources = get_resources()
+    loop = asyncio.get_running_loop()
+    count_db_round_trip()
+    started = time.perf_counter()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(resources.db_executor, query.execute),
+            timeout=timeout or resources.settings.db_timeout
+        )
+    finally:
+        db_query_seconds.observe(time.perf_counter() - started, *describe_query(query))
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+import httpx
+from fastapi import Depends, Request
+from config import Settings, get_settings
+from services.http_client import create_http_client
+from utils.cache import AsyncTTLCache
+from utils.log import get_logger
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = get_logger(__name__)
+
+
+class Resources:
+    """
+    Process-wide clients and caches. Nothing connects (or even imports the
+    supabase package) until first use; the app lifespan owns start-up and close.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.test_cache = AsyncTTLCache(maxsize=settings.test_cache_maxsize, ttl=settings.test_cache_ttl)
+        self.job_summary_cache = AsyncTTLCache(maxsize=settings.job_summary_cache_maxsize, ttl=settings.job_summary_cache_ttl)
+        self.evaluation_cache = AsyncTTLCache(maxsize=settings.evaluation_cache_maxsize, ttl=settings.evaluation_cache_ttl)
+        self._supabase = None
+        self._http: httpx.AsyncClient | None = None
+        self._db_executor: ThreadPoolExecutor | None = None
+
+    @property
+    def supabase(self) -> "Client":
+        if self._supabase is None:
+            from supabase import create_client
+            self._supabase = create_client(self.settings.supabase_url, self.settings.supabase_service_role_key)
+        return self._supabase
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = create_http_client(self.settings)
+        return self._http
+
+    @property
+    def db_executor(self) -> ThreadPoolExecutor:
+        if self._db_executor is None:
+            self._db_executor = ThreadPoolExecutor(max_workers=self.settings.db_max_workers, thread_name_prefix="supabase")
+        return self._db_executor
+
+    async def warm_up(self):
+        """
+        Build the DB client and open one pooled connection each to PostgREST and
+        OpenRouter, so the first requests don't pay for it. Failures are logged, never fatal.
+        """
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        def probe_db():
+            # Importing supabase and building the client happen here too, off the event loop
+            return self.supabase.table("question_sets").select("id").limit(1).execute()
+
+        async def warm_db():
+            await asyncio.wait_for(loop.run_in_executor(self.db_executor, probe_db), self.settings.warmup_timeout)
+
+        async def warm_http():
+            # Any answer (even 405) leaves a TLS connection in the pool
+            await self.http.head(self.settings.openrouter_url, timeout=self.settings.warmup_timeout)
+
+        results = await asyncio.gather(warm_db(), warm_http(), return_exceptions=True)
+        for name, result in zip(("database", "openrouter"), results):
+            if isinstance(result, BaseException):
+                logger.warning(f"⚠️ Warm-up of {name} failed: {result!r}")
+        logger.info(f"🔥 Warm-up finished in {time.perf_counter() - started:.2f}s")
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._db_executor is not None:
+            self._db_executor.shutdown(wait=False, cancel_futures=True)
+            self._db_executor = None
+
+
+_resources: Resources | None = None
+
+
+def get_resources() -> Resources:
+    """The current container; created from the environment on first use (scripts, workers)"""
+    global _resources
+    if _resources is None:
+        _resources = Resources(get_settings())
+    return _resources
+
+
+def set_resources(resources: Resources | None):
+    """Install the container services use, e.g. one built from explicit Settings in the lifespan"""
+    global _resources
+    _resources = resources
+
+
+# FastAPI dependencies (async so they don't take a threadpool hop per request)
+
+async def get_app_resources(request: Request) -> Resources:
+    return getattr(request.app.state, "resources", None) or get_resources()
+
+
+async def get_app_settings(resources: Resources = Depends(get_app_resources)) -> Settings:
+    return resources.settings
+
+
+async def get_db(resources: Resources = Depends(get_app_resources)) -> "Client":
+    return resources.supabase
@@ -1,148 +1,370 @@
-from fastapi import APIRouter, HTTPException
-from schemas.test_schemas import TestRequest, TestFinalizeRequest
-from services.test_generator import generate_questions
-from db.supabase import supabase
-from uuid import uuid4
-from typing import List
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from schemas.test_schemas import TestRequest, TestFinalizeRequest, CampaignRequest
+from services.test_generator import generate_questions, stream_questions, invalidate_job_summary
+from services.test_cache import invalidate_test
+from services.evaluation_cache import evaluation_cache_stats
+from services.test_sets import finalize_question_set, test_link
+from services.campaigns import run_campaign
+from services.result_export import (
+    RESULT_FIELDS, DEFAULT_RESULT_FIELDS, EXPORT_FORMATS, iter_result_rows, encode_results
+)
+from services.openrouter import RateLimited, limiter_stats
+from services.model_router import breaker_states
+from services.evaluation_queue import evaluation_queue
+from tasks.cleanup import cleanup_stats, run_cleanup
+from db.supabase import run_query
+from config import Settings
+from resources import Resources, get_app_resources, get_app_settings, get_db
+import json
+import asyncio
+from typing import List, Optional
+from uuid import UUID
+from datetime import datetime, timedelta, timezone
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
 @router.post("/generate-test")
 async def create_test(request: TestRequest):
     # Generate questions using LLM
-    questions = await generate_questions(request)
+    try:
+        questions = await generate_questions(request)
+    except RateLimited as e:
+        # Every model is at capacity: fail fast so the client can retry later
+        raise HTTPException(
+            status_code=503,
+            detail=f"Question generation is at capacity, try again shortly ({e.reason})",
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     return {"questions": questions}
 
+@router.post("/generate-test/stream")
+async def create_test_stream(request: TestRequest):
+    """Server-Sent Events variant of generate-test: one `question` event per question as soon as it is ready"""
+    async def events():
+        count = 0
+        try:
+            async for question in stream_questions(request):
+                count += 1
+                yield f"event: question\ndata: {json.dumps(question)}\n\n"
+        except Exception as e:
+            logger.error(f"❌ Error streaming questions: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'count': count})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/finalize-test")
 async def finalize_test(request: TestFinalizeRequest):
-    question_set_id = str(uuid4())
-    created_at = datetime.utcnow()
-    expires_at = created_at + timedelta(hours=2)
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="At least one question is required")
+
+    try:
+        test = await finalize_question_set(request.questions, request.duration, request.jd_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to finalize test: {str(e)}")
 
-    # Insert into question_sets with duration
-    supabase.table("question_sets").insert({
-        "id": question_set_id,
-        "jd_id": request.jd_id,
-        "created_at": created_at.isoformat(),
-        "expires_at": expires_at.isoformat(),
-        "duration": request.duration  # Add duration field
-    }).execute()
-
-    # Insert questions linked to this set
-    for q in request.questions:
-        supabase.table("questions").insert({
-            "question_set_id": question_set_id,
-            "jd_id": request.jd_id,
-            "question": q.question,        # ✅ Access attributes
-            "options": q.options,          # ✅ Might be None
-            "answer": q.answer,            # ✅ Optional
-            "created_at": created_at.isoformat(),
-            "expires_at": expires_at.isoformat()
-        }).execute()
-
-    test_link = f"http://localhost:5173/test/{question_set_id}"
     return {
-        "test_link": test_link,
-        "test_id": question_set_id,
+        **test,
         "jd_id": request.jd_id,
         "duration": request.duration,
         "message": "Test finalized successfully"
     }
 
+def _validate_campaign(request: CampaignRequest, settings: Settings):
+    jd_ids = set(request.jd_ids)
+    if not jd_ids:
+        raise HTTPException(status_code=400, detail="At least one jd_id is required")
+    if len(jd_ids) > settings.campaign_max_jds:
+        raise HTTPException(status_code=400, detail=f"At most {settings.campaign_max_jds} JDs per campaign")
+
+@router.post("/campaigns")
+async def create_campaign(request: CampaignRequest, settings: Settings = Depends(get_app_settings)):
+    """
+    Generate and finalize one test per JD concurrently. Returns when every JD is
+    done or failed: per-JD outcomes plus {jd_id: test_link} for the ones that succeeded.
+    """
+    _validate_campaign(request, settings)
+    summary = {}
+    async for event, data in run_campaign(request):
+        if event == "done":
+            summary = data
+    return summary
+
+@router.post("/campaigns/stream")
+async def create_campaign_stream(request: CampaignRequest, settings: Settings = Depends(get_app_settings)):
+    """Server-Sent Events variant of campaigns: a `progress` event per JD stage change, then `done` with the summary"""
+    _validate_campaign(request, settings)
+
+    async def events():
+        async for event, data in run_campaign(request):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _embedded_count(row: dict, relation: str) -> int:
+    """Read a PostgREST embedded aggregate like {"questions": [{"count": 5}]}"""
+    embedded = row.get(relation) or []
+    return embedded[0].get("count", 0) if embedded else 0
+
 @router.get("/tests")
-async def get_all_tests():
-    """Get all tests created by HR with their basic info"""
+async def get_all_tests(
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = None,
+    active_only: bool = False,
+    db=Depends(get_db)
+):
+    """Get tests created by HR with their basic info, newest first (cursor paged via `after`)"""
+    if after:
+        _parse_cursor(after)
+
     try:
-        # Fetch all question sets with basic info
-        result = supabase.table("question_sets").select("id, created_at, expires_at, duration").order("created_at", desc=True).execute()
+        # Question/submission counts are embedded aggregates: one round trip per page
+        query = db.table("question_sets").select(
+            "id, created_at, expires_at, duration, questions(count), test_results(count)",
+            count="exact"
+        )
+        if active_only:
+            query = query.gt("expires_at", datetime.utcnow().isoformat())
+        if after:
+            query = _after_cursor(query, after)
+
+        result = await run_query(query.order("created_at", desc=True).order("id", desc=True).limit(limit))
         
         tests = []
         for test in result.data:
-            # Get question count for each test
-            questions_result = supabase.table("questions").select("id", count="exact").eq("question_set_id", test["id"]).execute()
-            question_count = questions_result.count or 0
-            
-            # Get submission count for each test
-            submissions_result = supabase.table("test_results").select("id", count="exact").eq("question_set_id", test["id"]).execute()
-            submission_count = submissions_result.count or 0
-            
-            # Check if test is still active
+            # Check if test is still active (timestamptz comes back with an offset)
             expires_at = datetime.fromisoformat(test["expires_at"])
-            is_active = datetime.utcnow() < expires_at
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            is_active = datetime.now(timezone.utc) < expires_at
             
             tests.append({
                 "test_id": test["id"],
                 "duration": test.get("duration", 20),
-                "question_count": question_count,
-                "submission_count": submission_count,
+                "question_count": _embedded_count(test, "questions"),
+                "submission_count": _embedded_count(test, "test_results"),
                 "created_at": test["created_at"],
                 "expires_at": test["expires_at"],
                 "is_active": is_active,
-                "test_link": f"http://localhost:5173/test/{test['id']}"
+                "test_link": test_link(test["id"])
             })
+
+        # Same "<created_at>|<id>" keyset as the results pages
+        next_cursor = f"{tests[-1]['created_at']}|{tests[-1]['test_id']}" if len(tests) == limit else None
         
         return {
             "tests": tests,
-            "total_tests": len(tests)
+            "total_tests": result.count if result.count is not None else len(tests),
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
-        print(f"❌ Error fetching tests: {str(e)}")
+        logger.error(f"❌ Error fetching tests: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch tests: {str(e)}")
 
+
+def _parse_result_fields(fields: Optional[str], default: list = DEFAULT_RESULT_FIELDS) -> list:
+    if not fields:
+        return default
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in RESULT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # Every row keeps its id so HR can open the individual result
+    return ["result_id"] + [f for f in requested if f != "result_id"]
+
+
+def _parse_cursor(after: str):
+    """
+    Cursors are "<created_at>|<id>" of the last row on the previous page. Both parts
+    go into a PostgREST filter, so they are parsed and passed on in normalized form.
+    """
+    created_at, _, result_id = after.rpartition("|")
+    try:
+        return datetime.fromisoformat(created_at).isoformat(), str(UUID(result_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after_cursor(query, after: str):
+    """Rows after the cursor in (created_at, id) descending order; ties on created_at are broken by id"""
+    created_at, row_id = _parse_cursor(after)
+    return query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})')
+
+
+def _check_test_id(test_id: str):
+    """Test ids are UUIDs; anything else would fail in the uuid column and summary RPC instead of a plain 404"""
+    try:
+        UUID(test_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Test not found")
+
+
+async def load_results_summary(db, test_id: str) -> dict:
+    """Count, mean/median/p90 score, pass rate and histogram in one RPC (migration 007)"""
+    res = await run_query(db.rpc("test_results_summary", {"p_question_set_id": test_id}))
+    return res.data or {}
+
+
+async def load_results_page(db, test_id: str, fields: list, limit: int, after: Optional[str]) -> tuple:
+    """One page of submissions, newest first. Returns (results, next_cursor)."""
+    # id and created_at are always needed to build the cursor
+    columns = {RESULT_FIELDS[f] for f in fields} | {"id", "created_at"}
+    query = db.table("test_results").select(", ".join(sorted(columns))).eq("question_set_id", test_id)
+    if after:
+        query = _after_cursor(query, after)
+
+    res = await run_query(query.order("created_at", desc=True).order("id", desc=True).limit(limit))
+    rows = res.data or []
+
+    results = [{f: row.get(RESULT_FIELDS[f]) for f in fields} for row in rows]
+    next_cursor = f"{rows[-1]['created_at']}|{rows[-1]['id']}" if len(rows) == limit else None
+    return results, next_cursor
+
+
+@router.get("/tests/{test_id}/results/summary")
+async def get_test_results_summary(test_id: str, db=Depends(get_db)):
+    """Aggregate statistics for a test's submissions, without the submissions themselves"""
+    _check_test_id(test_id)
+    try:
+        summary = await load_results_summary(db, test_id)
+    except Exception as e:
+        logger.error(f"❌ Error fetching results summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch results summary: {str(e)}")
+    return {"test_id": test_id, **summary}
+
+
 @router.get("/tests/{test_id}/results")
-async def get_test_results(test_id: str):
-    """Get all submissions/results for a specific test"""
+async def get_test_results(
+    test_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_summary: bool = True,
+    db=Depends(get_db)
+):
+    """
+    Submissions for a test, newest first and cursor paged via `after`.
+    `fields` is a comma-separated projection (raw_feedback is opt-in);
+    the summary aggregates are computed in the database and left out with include_summary=false.
+    """
+    _check_test_id(test_id)
+    selected = _parse_result_fields(fields)
+    if after:
+        _parse_cursor(after)
+
     try:
-        # Fetch test results for the specific test
-        result = supabase.table("test_results").select("*").eq("question_set_id", test_id).order("created_at", desc=True).execute()
-        
-        # Also get test info
-        test_info = supabase.table("question_sets").select("duration").eq("id", test_id).execute()
-        test_duration = test_info.data[0]["duration"] if test_info.data else 20
-        
-        results = []
-        for res in result.data:
-            results.append({
-                "result_id": res["id"],
-                "score": res["score"],
-                "max_score": res["max_score"],
-                "percentage": res["percentage"],
-                "status": res["status"],
-                "duration_used_minutes": res.get("duration_used_minutes"),
-                "duration_used_seconds": res.get("duration_used_seconds"),
-                "submitted_at": res["created_at"],
-                "raw_feedback": res.get("raw_feedback", "")
-            })
-        
+        page = load_results_page(db, test_id, selected, limit, after)
+        if not include_summary:
+            results, next_cursor = await page
+            return {"test_id": test_id, "results": results, "next_cursor": next_cursor}
+
+        (results, next_cursor), summary = await asyncio.gather(page, load_results_summary(db, test_id))
         return {
             "test_id": test_id,
-            "test_duration": test_duration,
+            "test_duration": summary.get("test_duration") or 20,
             "results": results,
-            "total_submissions": len(results),
-            "average_score": sum(r["score"] for r in results) / len(results) if results else 0,
-            "average_time_used": sum(r["duration_used_minutes"] for r in results if r["duration_used_minutes"]) / len([r for r in results if r["duration_used_minutes"]]) if any(r["duration_used_minutes"] for r in results) else None
+            "next_cursor": next_cursor,
+            "total_submissions": summary.get("total_submissions", len(results)),
+            "average_score": summary.get("average_score") or 0,
+            "average_time_used": summary.get("average_time_used"),
+            "summary": summary
         }
-        
+
     except Exception as e:
-        print(f"❌ Error fetching test results: {str(e)}")
+        logger.error(f"❌ Error fetching test results: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch test results: {str(e)}")
 
+def _export_bound(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    # Naive bounds are taken as UTC, like created_at
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+
+
+async def _export_response(rows, fields: list, format: str, gzip: bool, filename: str) -> StreamingResponse:
+    chunks = encode_results(rows, fields, format, compress=gzip)
+    # Pull the first page before committing to a 200, so DB failures still surface as 500s
+    try:
+        first = await anext(chunks, b"")
+    except Exception as e:
+        logger.error(f"❌ Error exporting results: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to export results: {str(e)}")
+
+    async def body():
+        if first:
+            yield first
+        async for chunk in chunks:
+            yield chunk
+
+    filename = f"{filename}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        body(),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/tests/{test_id}/results/export")
+async def export_test_results(
+    test_id: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    db=Depends(get_db)
+):
+    """
+    Every submission for a test, oldest first, streamed as CSV or NDJSON.
+    Rows are read a keyset page at a time, so memory does not grow with the cohort.
+    """
+    _check_test_id(test_id)
+    selected = _parse_result_fields(fields)
+    rows = iter_result_rows(db, selected, test_id=test_id)
+    return await _export_response(rows, selected, format, gzip, f"results-{test_id}")
+
+
+@router.get("/results/export")
+async def export_results(
+    since: datetime,
+    until: Optional[datetime] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    db=Depends(get_db)
+):
+    """Submissions to all tests with since <= created_at < until, streamed like the per-test export"""
+    selected = _parse_result_fields(fields, default=["result_id", "test_id"] + DEFAULT_RESULT_FIELDS[1:])
+    since, until = _export_bound(since), _export_bound(until)
+    rows = iter_result_rows(db, selected, since=since, until=until)
+    return await _export_response(rows, selected, format, gzip, f"results-{since[:10]}")
+
 @router.delete("/tests/{test_id}")
-async def delete_test(test_id: str):
+async def delete_test(test_id: str, db=Depends(get_db)):
     """Delete a test and all its associated data"""
     try:
         # Delete in order: test_results -> questions -> question_sets
         
         # Delete test results
-        supabase.table("test_results").delete().eq("question_set_id", test_id).execute()
+        await run_query(db.table("test_results").delete().eq("question_set_id", test_id))
         
         # Delete questions
-        supabase.table("questions").delete().eq("question_set_id", test_id).execute()
+        await run_query(db.table("questions").delete().eq("question_set_id", test_id))
         
         # Delete question set
-        result = supabase.table("question_sets").delete().eq("id", test_id).execute()
+        result = await run_query(db.table("question_sets").delete().eq("id", test_id))
+        invalidate_test(test_id)
         
         if not result.data:
             raise HTTPException(status_code=404, detail="Test not found")
@@ -153,21 +375,27 @@ async def delete_test(test_id: str):
         }
         
     except Exception as e:
-        print(f"❌ Error deleting test: {str(e)}")
+        logger.error(f"❌ Error deleting test: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to delete test: {str(e)}")
 
 @router.put("/tests/{test_id}/extend")
-async def extend_test_expiry(test_id: str, hours: int = 24):
+async def extend_test_expiry(test_id: str, hours: int = 24, db=Depends(get_db)):
     """Extend the expiry time of a test"""
     try:
         new_expires_at = datetime.utcnow() + timedelta(hours=hours)
         
-        result = supabase.table("question_sets").update({
+        result = await run_query(db.table("question_sets").update({
             "expires_at": new_expires_at.isoformat()
-        }).eq("id", test_id).execute()
+        }).eq("id", test_id))
+        invalidate_test(test_id)
         
         if not result.data:
             raise HTTPException(status_code=404, detail="Test not found")
+
+        # The expiry cleanup deletes questions by their own expires_at, so they move with the set
+        await run_query(db.table("questions").update({
+            "expires_at": new_expires_at.isoformat()
+        }).eq("question_set_id", test_id))
         
         return {
             "message": f"Test expiry extended by {hours} hours",
@@ -176,15 +404,15 @@ async def extend_test_expiry(test_id: str, hours: int = 24):
         }
         
     except Exception as e:
-        print(f"❌ Error extending test expiry: {str(e)}")
+        logger.error(f"❌ Error extending test expiry: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to extend test expiry: {str(e)}")
 
 
 @router.get("/questions/{jd_id}")
-async def get_questions_by_jd(jd_id: str):
+async def get_questions_by_jd(jd_id: str, db=Depends(get_db)):
     try:
         # ✅ Fetch questions from Supabase by jd_id
-        response = supabase.table("questions").select("*").eq("jd_id", jd_id).execute()
+        response = await run_query(db.table("questions").select("*").eq("jd_id", jd_id))
  
         if not response.data:
             raise HTTPException(status_code=404, detail="No questions found for this jd_id")
@@ -196,4 +424,52 @@ async def get_questions_by_jd(jd_id: str):
         }
  
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(resources: Resources = Depends(get_app_resources)):
+    """Hit/miss counters for the in-process caches"""
+    return {
+        "tests": resources.test_cache.stats(),
+        "job_summaries": resources.job_summary_cache.stats(),
+        "evaluations": evaluation_cache_stats()
+    }
+
+
+@router.post("/jd/{jd_id}/invalidate-summary")
+async def invalidate_jd_summary(jd_id: str):
+    """Hook for the JD service to push summary changes"""
+    invalidate_job_summary(jd_id)
+    return {
+        "message": "Job summary cache invalidated",
+        "jd_id": jd_id
+    }
+
+
+@router.get("/llm-stats")
+async def get_llm_stats():
+    """Per-model limiter counters and circuit breaker states for outbound model calls"""
+    return {
+        "limiters": limiter_stats(),
+        "breakers": breaker_states()
+    }
+
+
+@router.get("/evaluation-stats")
+async def get_evaluation_stats():
+    """Workers, queue depth, in-flight and retry-scheduled submissions of the background evaluation queue"""
+    return evaluation_queue.stats()
+
+
+@router.get("/cleanup-stats")
+async def get_cleanup_stats():
+    """Rows deleted and duration of the scheduled expiry cleanup"""
+    return cleanup_stats
+
+
+@router.post("/cleanup")
+async def trigger_cleanup():
+    """Run one cleanup pass now instead of waiting for the schedule"""
+    deleted = await run_cleanup()
+    return {"deleted": deleted, "duration_seconds": cleanup_stats["last_duration_seconds"]}
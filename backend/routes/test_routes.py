@@ -1,23 +1,29 @@
 # backend/routes/test_routes.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
 from datetime import datetime, timezone
-from db.supabase import supabase
+from typing import Optional
+from db.supabase import run_query
+from resources import get_db
 from schemas.test_schemas import TestSubmission
-from services.test_evaluator import evaluate_test
+from services.evaluation_queue import evaluation_queue
+from services.test_cache import get_test
+from services.submissions import RESULT_COLUMNS, submission_key, store_submission
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
 
 @router.get("/{question_set_id}")
 async def fetch_test(question_set_id: str):
-    res = supabase.table("question_sets").select("*").eq("id", question_set_id).execute()
-    print("📄 Supabase question_set response:", res)
+    test_info = await get_test(question_set_id)
 
-    if not res.data or len(res.data) == 0:
+    if not test_info:
         raise HTTPException(status_code=404, detail="Test not found")
 
-    test_info = res.data[0]
     expires_at = test_info.get("expires_at")
     duration = test_info.get("duration", 20)  # Get duration, default to 20 minutes
 
@@ -27,68 +33,116 @@ async def fetch_test(question_set_id: str):
     if now > expires_dt:
         raise HTTPException(status_code=410, detail="Test expired")
 
-    q_res = supabase.table("questions").select("question, options").eq("question_set_id", question_set_id).execute()
-
-    if not q_res.data:
+    if not test_info["questions"]:
         raise HTTPException(status_code=404, detail="No questions found")
 
     return {
-        "questions": q_res.data,
+        "questions": test_info["questions"],
         "duration": duration,  # Include duration in response
         "test_id": question_set_id
     }
 
 
-@router.post("/submit")
-async def submit_test(submission: TestSubmission):
-    print("📨 Received test submission:", submission.dict())
-
-    # Evaluate the test
-    result = await evaluate_test(submission)
-    print("✅ Evaluation result:", result)
+@router.post("/submit", status_code=202)
+async def submit_test(
+    submission: TestSubmission,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Store a submission and queue it for scoring. Repeats with the same
+    Idempotency-Key (or, without one, the same payload) return the stored
+    submission instead of creating and evaluating another one.
+    """
+    logger.info(f"📨 Received test submission for {submission.question_set_id}")
+    key = submission_key(submission, idempotency_key)
 
     # Calculate duration used in minutes if provided
     duration_used_minutes = None
     if submission.duration_used:
         duration_used_minutes = round(submission.duration_used / 60, 2)
 
-    # Always try to save the result, even if evaluation had issues
+    max_score = len(submission.questions) * 10
+
+    # Persist the raw submission first; scoring happens in the evaluation worker pool
+    insert_data = {
+        "question_set_id": str(submission.question_set_id),
+        "score": 0,
+        "max_score": max_score,
+        "percentage": 0.0,
+        "status": "Pending",
+        "total_questions": len(submission.questions),
+        "raw_feedback": "",
+        "duration_used_seconds": submission.duration_used,
+        "duration_used_minutes": duration_used_minutes,
+        "evaluation_status": "pending",
+        "submission": jsonable_encoder(submission)
+    }
+
     try:
-        # Prepare data for database insertion
-        insert_data = {
-            "question_set_id": str(submission.question_set_id),
-            "score": result.get("score", 0),
-            "max_score": result.get("max_score", len(submission.questions) * 10),
-            "percentage": result.get("percentage", 0.0),
-            "status": result.get("status", "Fail"),
-            "total_questions": len(submission.questions),
-            "raw_feedback": result.get("raw_feedback", ""),
-            "duration_used_seconds": submission.duration_used,
-            "duration_used_minutes": duration_used_minutes
-        }
-        
-        # Insert into database
-        db_result = supabase.table("test_results").insert(insert_data).execute()
-        print("💾 Saved to database:", db_result.data[0] if db_result.data else "No data returned")
-        
-        # Add the database ID to the result
-        if db_result.data:
-            result["result_id"] = db_result.data[0].get("id")
-            
+        row, created = await store_submission(key, insert_data)
     except Exception as e:
-        print("❌ Error inserting into Supabase:", e)
-        # Don't raise an exception here - we still want to return the evaluation result
-        # Just log the error and continue
-        result["database_error"] = str(e)
+        logger.error(f"❌ Error inserting into Supabase: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to save submission: {str(e)}")
+
+    result_id = row.get("id")
+    if not created:
+        # Already stored: attach to its evaluation (or its result) instead of starting another
+        logger.info(f"🔁 Duplicate submission for {submission.question_set_id}, returning {result_id}")
+        response.headers["Idempotent-Replayed"] = "true"
+        if row["evaluation_status"] in ("done", "failed"):
+            response.status_code = 200
+        elif row["evaluation_status"] == "pending":
+            # No-op while it is queued here; re-queues it if the original enqueue was lost
+            evaluation_queue.enqueue(result_id)
+        return {
+            **result_response(row),
+            "max_score": row.get("max_score"),
+            "duration_used": row.get("duration_used_minutes"),
+            "duplicate": True
+        }
+
+    evaluation_queue.enqueue(result_id)
 
-    # Return the evaluation result (with additional fields)
     return {
-        "score": result.get("score", 0),
-        "max_score": result.get("max_score", len(submission.questions) * 10),
-        "percentage": result.get("percentage", 0.0),
-        "status": result.get("status", "Fail"),
-        "raw_feedback": result.get("raw_feedback", ""),
-        "result_id": result.get("result_id"),
-        "database_error": result.get("database_error"),
+        "result_id": result_id,
+        "evaluation_status": "pending",
+        "max_score": max_score,
         "duration_used": duration_used_minutes
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/results/{result_id}")
+async def get_submission_result(result_id: str, db=Depends(get_db)):
+    """Poll the evaluation progress and, once done, the score of a submission"""
+    res = await run_query(db.table("test_results").select(RESULT_COLUMNS).eq("id", result_id))
+
+    if not res.data:
+        raise HTTPException(status_code=404, detail="Result not found")
+
+    return result_response(res.data[0])
+
+
+def result_response(row: dict) -> dict:
+    """Evaluation progress of a stored submission and, once finished, its score"""
+    response = {
+        "result_id": row["id"],
+        "evaluation_status": row["evaluation_status"],
+        "attempts": row.get("attempts", 0),
+        "submitted_at": row["created_at"]
+    }
+
+    if row["evaluation_status"] in ("done", "failed"):
+        response.update({
+            "score": row["score"],
+            "max_score": row["max_score"],
+            "percentage": row["percentage"],
+            "status": row["status"],
+            "raw_feedback": row.get("raw_feedback", ""),
+            "question_scores": row.get("question_scores"),
+            "total_questions": row.get("total_questions"),
+            "duration_used": row.get("duration_used_minutes"),
+            "evaluated_at": row.get("evaluated_at")
+        })
+
+    return response
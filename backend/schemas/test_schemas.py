@@ -37,10 +37,15 @@ from pydantic import BaseModel
 from typing import List, Optional
 from uuid import UUID
  
+class TestCase(BaseModel):
+    input: str = ""  # Fed to the program on stdin
+    expected_output: str
+
 class Question(BaseModel):
     question: str
     options: Optional[List[str]] = None
     answer: Optional[str] = None
+    test_cases: Optional[List[TestCase]] = None  # Coding questions only; never sent to candidates
     
  
 class TestRequest(BaseModel):
@@ -51,12 +56,23 @@ class TestRequest(BaseModel):
     mcq_count: Optional[int] = 0
     coding_count: Optional[int] = 0
     jd_id: Optional[str] = None  # ✅ Added in case you generate questions for a JD
+    fresh: Optional[bool] = False  # Skip the question bank and generate everything anew
  
 class TestFinalizeRequest(BaseModel):
     questions: List[Question]  # Expect list of question dicts
     duration: Optional[int] = 20  # Duration in minutes, default 20
     jd_id: str  # ✅ Required so we can link questions to a JD
  
+class CampaignRequest(BaseModel):
+    jd_ids: List[str]  # One test is generated and finalized per JD
+    difficulty: str
+    num_questions: int
+    question_type: Optional[str] = "mcq"  # values: "mcq", "coding", "mixed"
+    mcq_count: Optional[int] = 0
+    coding_count: Optional[int] = 0
+    duration: Optional[int] = 20  # Duration in minutes for every test in the campaign
+    fresh: Optional[bool] = False
+ 
 class TestSubmission(BaseModel):
     question_set_id: UUID  # UUID, not str
     questions: List[Question]
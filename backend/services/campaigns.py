@@ -0,0 +1,97 @@
+import time
+import asyncio
+from uuid import uuid4
+from resources import get_resources
+from schemas.test_schemas import CampaignRequest, Question, TestRequest
+from services.test_generator import MOCK_QUESTIONS, fetch_job_summary, generate_questions
+from services.test_sets import finalize_question_set
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+TERMINAL_STATUSES = ("done", "failed")
+
+# Campaign tasks keep running if the client disconnects; hold references until they finish
+_running: set[asyncio.Task] = set()
+
+
+async def build_campaign_test(jd_id: str, request: CampaignRequest, update) -> dict:
+    """Generate and finalize the test for one JD, reporting each stage through `update`"""
+    # Without a real summary the questions would be generic; fail the JD rather than ship those
+    if not await fetch_job_summary(jd_id):
+        raise RuntimeError("job summary unavailable")
+
+    update(status="generating")
+    questions = await generate_questions(TestRequest(
+        topic="",
+        difficulty=request.difficulty,
+        num_questions=request.num_questions,
+        question_type=request.question_type,
+        mcq_count=request.mcq_count,
+        coding_count=request.coding_count,
+        jd_id=jd_id,
+        fresh=request.fresh
+    ))
+    if questions == MOCK_QUESTIONS:
+        raise RuntimeError("question generation failed")
+
+    update(status="finalizing", question_count=len(questions))
+    return await finalize_question_set([Question(**q) for q in questions], request.duration, jd_id)
+
+
+async def run_campaign(request: CampaignRequest):
+    """
+    Generate and finalize one test per JD, campaign_concurrency at a time
+    (model calls are still paced by the per-model limiters).
+    Yields ("progress", jd_state) on every stage change and finally
+    ("done", summary) with every JD's outcome and the test links.
+    """
+    campaign_id = str(uuid4())
+    jd_ids = list(dict.fromkeys(request.jd_ids))
+    states = {jd_id: {"jd_id": jd_id, "status": "queued"} for jd_id in jd_ids}
+    events: asyncio.Queue = asyncio.Queue()
+    concurrency = get_resources().settings.campaign_concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    logger.info(f"🚀 Campaign {campaign_id}: {len(jd_ids)} JDs, {concurrency} at a time")
+
+    async def run_one(jd_id: str):
+        def update(**changes):
+            states[jd_id].update(changes)
+            events.put_nowait(dict(states[jd_id]))
+
+        async with semaphore:
+            jd_started = time.perf_counter()
+            try:
+                test = await build_campaign_test(jd_id, request, update)
+                update(status="done", test_id=test["test_id"], test_link=test["test_link"],
+                       seconds=round(time.perf_counter() - jd_started, 2))
+            except Exception as e:
+                logger.error(f"❌ Campaign {campaign_id}: JD {jd_id} failed: {e}")
+                update(status="failed", error=str(e), seconds=round(time.perf_counter() - jd_started, 2))
+
+    for jd_id in jd_ids:
+        task = asyncio.create_task(run_one(jd_id))
+        _running.add(task)
+        task.add_done_callback(_running.discard)
+
+    finished = 0
+    while finished < len(jd_ids):
+        state = await events.get()
+        if state["status"] in TERMINAL_STATUSES:
+            finished += 1
+        yield "progress", state
+
+    results = [states[jd_id] for jd_id in jd_ids]
+    succeeded = [r for r in results if r["status"] == "done"]
+    elapsed = time.perf_counter() - started
+    logger.info(f"✅ Campaign {campaign_id}: {len(succeeded)}/{len(results)} tests in {elapsed:.1f}s")
+    yield "done", {
+        "campaign_id": campaign_id,
+        "total": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "elapsed_seconds": round(elapsed, 2),
+        "results": results,
+        "test_links": {r["jd_id"]: r["test_link"] for r in succeeded}
+    }
@@ -0,0 +1,311 @@
+import os
+import sys
+import shutil
+import asyncio
+import signal
+import tempfile
+from utils.log import get_logger
+from resources import get_resources
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits and no namespaces, so nothing is run
+    resource = None
+
+logger = get_logger(__name__)
+
+# The API's own source tree (config, .env) is never visible to candidate code
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs as root of a fresh user namespace that also has its own (empty) network,
+# PID and mount namespaces, then drops every capability before starting the
+# interpreter:
+#   - every inherited mount is remounted read-only (kernel pseudo-filesystems may refuse; they stay as they are)
+#   - the hidden paths are covered by an empty read-only tmpfs
+#   - the temp dir is replaced by a small private tmpfs, so other candidates' runs
+#     can't be seen; the solution is bind-mounted read-only at $tmp/sandbox,
+#     reached through the working directory taken before the temp dir was covered
+#   - RLIMIT_NPROC is set from inside the namespace, so it counts the sandbox's
+#     own processes on current kernels instead of every process of the API's uid
+# Without capabilities the candidate can't undo any of this (umount, remount rw),
+# and in its own PID namespace it can't see or signal the API worker.
+# The interpreter runs as a child of the script rather than as the namespace's
+# init (which ignores SIGXCPU), and the script exits with its status, so a
+# CPU-limit kill shows up as 128 + signal.
+# Args: workdir tmp nproc tmpfs_mb hidden... -- argv...
+_JAIL_SCRIPT = r"""
+set -e
+work=$1 tmp=$2 nproc=$3 tmpfs_mb=$4
+shift 4
+while read -r _ mnt _; do
+    mount -o remount,bind,ro "$mnt" 2>/dev/null || case $mnt in
+        /proc|/proc/*|/sys|/sys/*|/dev|/dev/*) ;;
+        *) echo "sandbox: cannot make $mnt read-only" >&2; exit 125 ;;
+    esac
+done < /proc/self/mounts
+while [ "$1" != "--" ]; do
+    [ -e "$1" ] && mount -t tmpfs -o ro,size=4k,mode=0 tmpfs "$1"
+    shift
+done
+shift
+cd "$work"
+mount -t tmpfs -o "size=${tmpfs_mb}m,mode=1777" tmpfs "$tmp"
+mkdir "$tmp/sandbox"
+mount --no-canonicalize --bind . "$tmp/sandbox"
+mount -o remount,bind,ro "$tmp/sandbox"
+cd "$tmp/sandbox"
+prlimit --pid $$ --nproc="$nproc:$nproc"
+status=0
+setpriv --no-new-privs --bounding-set=-all --inh-caps=-all -- "$@" || status=$?
+exit $status
+"""
+
+_JAIL_TOOLS = ("unshare", "mount", "prlimit", "setpriv", "sh")
+# Seconds a sandbox probe may take before the sandbox or language counts as unavailable
+_PROBE_TIMEOUT = 10
+
+# Exit statuses of the jail script when the interpreter was killed by the CPU-time
+# limit: SIGXCPU at the soft limit, SIGKILL at the hard one
+_CPU_LIMIT_STATUSES = {128 + signal.SIGXCPU, 128 + signal.SIGKILL, -signal.SIGXCPU, -signal.SIGKILL}
+
+# The base interpreter, not a venv's symlink to it: candidates don't need the
+# API's packages, and a venv inside the backend directory is hidden in the sandbox
+_PYTHON = os.path.realpath(sys.executable)
+
+# language -> (source file name, interpreter argv builder taking memory_mb,
+#              arguments that make the interpreter exit at once, apply address-space limit)
+# V8 reserves far more virtual memory than it uses, so node gets a heap cap instead
+LANGUAGES = {
+    "python": ("solution.py", lambda mb: [_PYTHON, "-I"], ["-c", "pass"], True),
+    "javascript": ("solution.js", lambda mb: ["node", f"--max-old-space-size={mb}"], ["-e", ""], False),
+    "php": ("solution.php", lambda mb: ["php"], ["-r", ""], True),
+    "ruby": ("solution.rb", lambda mb: ["ruby"], ["-e", ""], True),
+}
+
+_semaphore: asyncio.Semaphore | None = None
+_jail_ok: bool | None = None
+_hidden_paths: list | None = None
+_probe_lock: asyncio.Lock | None = None
+# language -> whether its interpreter ran inside the sandbox
+_supported: dict = {}
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(get_resources().settings.code_runner_workers)
+    return _semaphore
+
+
+def _within(path: str, directory: str) -> bool:
+    """Whether `path`, as given or with symlinks resolved, is `directory` or lies under it"""
+    directory = os.path.realpath(directory)
+    return any(
+        candidate == directory or candidate.startswith(directory + os.sep)
+        for candidate in (os.path.abspath(path), os.path.realpath(path))
+    )
+
+
+def _interpreter(language: str) -> str | None:
+    return shutil.which(LANGUAGES[language][1](0)[0])
+
+
+def _get_hidden_paths() -> list:
+    """
+    BACKEND_DIR plus code_runner_hidden_paths, except configured paths that contain
+    an interpreter: hiding those would break every run of that language
+    """
+    global _hidden_paths
+    if _hidden_paths is None:
+        interpreters = [path for path in map(_interpreter, LANGUAGES) if path]
+        _hidden_paths = [BACKEND_DIR]
+        for hidden in get_resources().settings.code_runner_hidden_paths:
+            needed = [path for path in interpreters if _within(path, hidden)]
+            if needed:
+                logger.warning(f"⚠️ Not hiding {hidden} from the code sandbox: it contains {', '.join(needed)}")
+            else:
+                _hidden_paths.append(hidden)
+    return _hidden_paths
+
+
+def _jail_prefix(workdir: str) -> list:
+    """argv that runs a command inside the sandbox described at _JAIL_SCRIPT, from `workdir`"""
+    settings = get_resources().settings
+    return [
+        "unshare", "--user", "--map-root-user", "--net", "--pid", "--fork", "--mount-proc", "--kill-child",
+        "sh", "-c", _JAIL_SCRIPT, "sh",
+        workdir,
+        tempfile.gettempdir(),
+        str(settings.code_runner_max_processes),
+        str(settings.code_runner_tmpfs_mb),
+        *_get_hidden_paths(),
+        "--"
+    ]
+
+
+async def _run_probe(argv: list, preexec_fn=None):
+    """Run a probe command without blocking the event loop. Returns (exit status, stderr)."""
+    proc = await asyncio.create_subprocess_exec(
+        *argv,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        preexec_fn=preexec_fn,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=_PROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    return proc.returncode, stderr.decode(errors="replace")[-300:]
+
+
+async def jail_available() -> bool:
+    """Whether the sandbox can be built on this host; checked once by running it for real"""
+    global _jail_ok
+    if _jail_ok is None:
+        _jail_ok = False
+        if os.name == "posix" and resource is not None and all(shutil.which(tool) for tool in _JAIL_TOOLS):
+            try:
+                with tempfile.TemporaryDirectory(prefix="candidate-") as workdir:
+                    status, stderr = await _run_probe(_jail_prefix(workdir) + ["true"])
+                _jail_ok = status == 0
+                if not _jail_ok:
+                    logger.warning(f"⚠️ Sandbox probe failed: {stderr}")
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"⚠️ Sandbox probe failed: {e!r}")
+        if not _jail_ok:
+            logger.warning("⚠️ Code sandbox unavailable (needs unshare, mount, prlimit, setpriv and user namespaces); coding answers are not run")
+    return _jail_ok
+
+
+async def _probe_language(language: str) -> bool:
+    """Start the language's interpreter inside the sandbox, under the same limits as a real run"""
+    interpreter = _interpreter(language)
+    if interpreter is None or not await jail_available():
+        return False
+    for directory in (BACKEND_DIR, tempfile.gettempdir()):
+        if _within(interpreter, directory):
+            logger.warning(f"⚠️ {language} interpreter {interpreter} is under {directory}, which the code sandbox hides; {language} answers are not run")
+            return False
+
+    settings = get_resources().settings
+    _, build_argv, probe_args, limit_address_space = LANGUAGES[language]
+    try:
+        with tempfile.TemporaryDirectory(prefix="candidate-") as workdir:
+            status, stderr = await _run_probe(
+                _jail_prefix(workdir) + build_argv(settings.code_runner_memory_mb) + probe_args,
+                preexec_fn=_limits(
+                    settings.code_runner_cpu_seconds,
+                    settings.code_runner_memory_mb if limit_address_space else None
+                ),
+            )
+    except (OSError, asyncio.TimeoutError) as e:
+        logger.warning(f"⚠️ {language} sandbox probe failed: {e!r}")
+        return False
+    if status != 0:
+        logger.warning(f"⚠️ {language} sandbox probe failed: {stderr}")
+        return False
+    return True
+
+
+async def is_supported(language: str | None) -> bool:
+    """Whether answers in `language` can be run here; probed once per language"""
+    language = (language or "").lower()
+    if language not in LANGUAGES:
+        return False
+    if language not in _supported:
+        global _probe_lock
+        if _probe_lock is None:
+            _probe_lock = asyncio.Lock()
+        # Concurrent first submissions wait for one probe instead of each starting their own
+        async with _probe_lock:
+            if language not in _supported:
+                _supported[language] = await _probe_language(language)
+    return _supported[language]
+
+
+def _limits(cpu_seconds: int, memory_mb: int | None):
+    """rlimits for the child; `memory_mb` None skips the address-space limit"""
+    def apply():
+        os.setsid()
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (1024 * 1024, 1024 * 1024))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if memory_mb:
+            memory = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    return apply
+
+
+def outputs_match(actual: str, expected: str) -> bool:
+    """Compare stdout ignoring trailing whitespace on each line and trailing blank lines"""
+    def clean(text):
+        return "\n".join(line.rstrip() for line in str(text).strip().splitlines())
+    return clean(actual) == clean(expected)
+
+
+async def _run_case(argv: list, limit_address_space: bool, stdin: str, expected: str) -> dict:
+    settings = get_resources().settings
+    async with _get_semaphore():
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            # Paths as seen inside the sandbox, where the temp dir is a private tmpfs
+            env={"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "HOME": tempfile.gettempdir(), "TMPDIR": tempfile.gettempdir(), "LANG": "C.UTF-8"},
+            preexec_fn=_limits(
+                settings.code_runner_cpu_seconds,
+                settings.code_runner_memory_mb if limit_address_space else None
+            ),
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(str(stdin or "").encode()),
+                timeout=settings.code_runner_wall_seconds
+            )
+        except asyncio.TimeoutError:
+            # Kills unshare; --kill-child takes the whole PID namespace with it
+            proc.kill()
+            await proc.wait()
+            return {"passed": False, "status": "time_limit", "stderr": ""}
+
+    stdout = stdout[:settings.code_runner_output_bytes].decode(errors="replace")
+    if proc.returncode != 0:
+        status = "time_limit" if proc.returncode in _CPU_LIMIT_STATUSES else "runtime_error"
+        return {"passed": False, "status": status, "stderr": stderr[-500:].decode(errors="replace")}
+
+    passed = outputs_match(stdout, expected)
+    return {"passed": passed, "status": "ok" if passed else "wrong_answer"}
+
+
+async def run_test_cases(code: str, language: str, test_cases: list) -> dict | None:
+    """
+    Run a candidate's solution against stdin/stdout test cases in sandboxed,
+    resource-limited subprocesses (read-only filesystem, private temp dir, own
+    PID and empty network namespaces, no capabilities, CPU/memory/process/wall-clock limits).
+    Returns None when the language has no interpreter or the sandbox can't be built on this host.
+    Returns: {"passed": int, "total": int, "cases": [{"passed", "status", ...}]}
+    """
+    language = (language or "").lower()
+    if not test_cases or not await is_supported(language):
+        return None
+
+    filename, build_argv, _, limit_address_space = LANGUAGES[language]
+    with tempfile.TemporaryDirectory(prefix="candidate-") as workdir:
+        with open(os.path.join(workdir, filename), "w", encoding="utf-8") as f:
+            f.write(code or "")
+
+        argv = _jail_prefix(workdir) + build_argv(get_resources().settings.code_runner_memory_mb) + [filename]
+        cases = await asyncio.gather(*[
+            _run_case(argv, limit_address_space, case.get("input", ""), case.get("expected_output", ""))
+            for case in test_cases
+        ])
+
+    return {
+        "passed": sum(1 for c in cases if c["passed"]),
+        "total": len(cases),
+        "cases": cases
+    }
@@ -0,0 +1,107 @@
+import re
+import json
+import hashlib
+from datetime import datetime, timezone
+from db.supabase import get_supabase_client, run_query
+from resources import get_resources
+from utils.text_utils import normalize_text
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Per-question model scores keyed by content, so the same (question, answer) pair is
+# only ever sent to the model once. Memory (resources.evaluation_cache) is a bounded
+# LRU in front of the evaluation_cache table, which is shared across workers and
+# survives restarts (unless settings.evaluation_cache_persist is off).
+# Bump when the scoring prompt or rubric changes so old scores stop matching
+EVALUATION_CACHE_VERSION = "v1"
+
+db_hits = 0
+
+_BLOCK_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+# Whole-line comments only: a trailing "#" may sit inside a string literal
+_LINE_COMMENT = re.compile(r"^\s*(?:#(?![a-z!])|//)")
+_INNER_SPACE = re.compile(r"(?<=\S)[ \t]+")
+
+
+def normalize_code(code: str) -> str:
+    """
+    Drop comment lines, blank lines and trailing/inner whitespace runs.
+    Leading indentation is kept since it is meaningful in Python.
+    """
+    code = _BLOCK_COMMENT.sub("", str(code or ""))
+    lines = []
+    for line in code.expandtabs(4).splitlines():
+        line = line.rstrip()
+        if line.strip() and not _LINE_COMMENT.match(line):
+            lines.append(_INNER_SPACE.sub(" ", line))
+    return "\n".join(lines)
+
+
+def evaluation_key(question: str, options: list | None, answer: str, mode: str) -> str:
+    """
+    Content hash of a question and an already-normalized answer.
+    `mode` separates full scores from quality-only scores of test-checked code.
+    """
+    raw = json.dumps(
+        [EVALUATION_CACHE_VERSION, mode, normalize_text(question), [normalize_text(o) for o in options or []], answer],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def lookup_evaluations(keys: list[str]) -> dict:
+    """
+    Returns: {key: {"score": int, "feedback": str}} for every key already scored.
+    """
+    global db_hits
+    evaluation_cache = get_resources().evaluation_cache
+    found, missing = {}, []
+    for key in dict.fromkeys(keys):
+        entry = evaluation_cache.get(key)
+        if entry is not None:
+            evaluation_cache.hits += 1
+            found[key] = entry
+        else:
+            missing.append(key)
+
+    if missing and get_resources().settings.evaluation_cache_persist:
+        try:
+            res = await run_query(
+                get_supabase_client().table("evaluation_cache").select("cache_key, score, feedback").in_("cache_key", missing)
+            )
+            for row in res.data or []:
+                entry = {"score": row["score"], "feedback": row.get("feedback") or ""}
+                evaluation_cache.set(row["cache_key"], entry)
+                found[row["cache_key"]] = entry
+                db_hits += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Evaluation cache lookup failed: {e}")
+
+    evaluation_cache.misses += sum(1 for key in missing if key not in found)
+    return found
+
+
+async def store_evaluations(entries: dict):
+    """Save {key: {"score", "feedback"}} to memory and, best effort, to the table"""
+    if not entries:
+        return
+    resources = get_resources()
+    for key, entry in entries.items():
+        resources.evaluation_cache.set(key, entry)
+
+    if not resources.settings.evaluation_cache_persist:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {"cache_key": key, "score": entry["score"], "feedback": entry.get("feedback") or "", "created_at": now}
+        for key, entry in entries.items()
+    ]
+    try:
+        await run_query(get_supabase_client().table("evaluation_cache").upsert(rows, on_conflict="cache_key"))
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to persist {len(rows)} cached evaluations: {e}")
+
+
+def evaluation_cache_stats() -> dict:
+    return {**get_resources().evaluation_cache.stats(), "db_hits": db_hits}
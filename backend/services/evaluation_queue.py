@@ -0,0 +1,256 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from db.supabase import get_supabase_client, run_query
+from schemas.test_schemas import TestSubmission
+from services.test_evaluator import evaluate_test
+from utils.log import get_logger, request_id_var
+from resources import get_resources
+
+logger = get_logger(__name__)
+
+# Statuses evaluate_test returns when scoring could not complete
+RETRYABLE_STATUSES = {"Evaluation failed", "Network error", "Internal error", "Rate limited"}
+
+
+def _utc(value: str) -> datetime:
+    """timestamptz as returned by PostgREST (with an offset); naive values are taken as UTC"""
+    parsed = datetime.fromisoformat(value)
+    return parsed.astimezone(timezone.utc) if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class EvaluationQueue:
+    """
+    In-process worker pool that scores stored submissions.
+    Work items are test_results ids; the row itself is the source of truth,
+    so anything lost from memory is picked up again by recover_pending(),
+    which sweeps for unclaimed and orphaned rows every evaluation_lease_seconds.
+    """
+
+    def __init__(self, workers: int | None = None, maxsize: int | None = None):
+        # Unset sizes come from the settings when the queue starts
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._retries: set[asyncio.Task] = set()
+        self._recovery: asyncio.Task | None = None
+        # Ids queued or being scored, so a duplicate enqueue never starts a second evaluation
+        self._active: set = set()
+        # Ids waiting out a retry delay, which the recovery sweep must not bring forward
+        self._waiting: set = set()
+        # id -> attempts value of the rows this process has claimed and not yet released
+        self._claimed: dict = {}
+
+    async def start(self):
+        if self._tasks:
+            return
+        settings = get_resources().settings
+        self._queue = asyncio.Queue(maxsize=self.maxsize or settings.evaluation_queue_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers or settings.evaluation_workers)]
+        # In the background, so startup never waits on (or fails with) the database
+        self._recovery = asyncio.create_task(self._recovery_loop(settings.evaluation_lease_seconds))
+
+    async def stop(self):
+        tasks = [*self._tasks, *self._retries, *([self._recovery] if self._recovery else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Hand in-flight rows back so the next process (or another worker) picks them up now, not after the lease
+        await self._release_claims()
+        self._tasks = []
+        self._queue = None
+        self._recovery = None
+        self._active.clear()
+        self._retries.clear()
+        self._waiting.clear()
+
+    async def _release_claims(self):
+        for result_id, attempts in list(self._claimed.items()):
+            try:
+                await run_query(
+                    get_supabase_client().table("test_results")
+                    .update({"evaluation_status": "pending", "claimed_at": None})
+                    .eq("id", result_id)
+                    .eq("evaluation_status", "running")
+                    .eq("attempts", attempts)
+                )
+            except Exception as e:
+                logger.error(f"❌ Failed to release evaluation {result_id}: {e}")
+        if self._claimed:
+            logger.info(f"↩️ Released {len(self._claimed)} in-flight evaluations")
+        self._claimed.clear()
+
+    def enqueue(self, result_id) -> bool:
+        """Queue a stored submission for scoring. False if the queue is full or stopped (the row stays pending)."""
+        if result_id in self._active:
+            return True
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(result_id)
+            self._active.add(result_id)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"⚠️ Evaluation queue full, {result_id} left pending for recovery")
+            return False
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "active": len(self._active),
+            "scheduled_retries": len(self._retries)
+        }
+
+    async def _recovery_loop(self, interval: float):
+        while True:
+            await self.recover_pending()
+            await asyncio.sleep(interval)
+
+    async def recover_pending(self):
+        """
+        Re-enqueue pending submissions (never queued, or dropped on a full queue) and
+        running ones whose lease has expired (their worker died)
+        """
+        if self._queue is None:
+            return
+        lease = get_resources().settings.evaluation_lease_seconds
+        expired = (datetime.now(timezone.utc) - timedelta(seconds=lease)).isoformat()
+        try:
+            res = await run_query(
+                get_supabase_client().table("test_results")
+                .select("id")
+                .or_(
+                    "evaluation_status.eq.pending,"
+                    f'and(evaluation_status.eq.running,or(claimed_at.is.null,claimed_at.lt."{expired}"))'
+                )
+                .order("created_at")
+                .limit(self._queue.maxsize)
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to recover pending evaluations: {e}")
+            return
+
+        ids = [row["id"] for row in res.data or [] if row["id"] not in self._waiting]
+        queued = sum(1 for result_id in ids if self.enqueue(result_id))
+        if queued:
+            logger.info(f"♻️ Re-enqueued {queued} unfinished evaluations")
+
+    async def _worker(self, index: int):
+        while True:
+            result_id = await self._queue.get()
+            try:
+                await self._process(result_id)
+            except asyncio.CancelledError:
+                # The claim stays recorded so stop() can release it
+                raise
+            except Exception as e:
+                # A row left running here is picked up by the sweep once its lease expires
+                logger.error(f"❌ Evaluation worker {index} failed on {result_id}: {e}")
+                self._claimed.pop(result_id, None)
+            finally:
+                self._active.discard(result_id)
+                self._queue.task_done()
+
+    async def _claim(self, result_id):
+        """
+        Mark a row running; returns it, or None if it's finished or owned by a live worker.
+        A claim is identified by the attempts value it set, and its lease runs from claimed_at.
+        """
+        res = await run_query(
+            get_supabase_client().table("test_results")
+            .select("id, submission, attempts, evaluation_status, claimed_at")
+            .eq("id", result_id)
+        )
+        if not res.data:
+            return None
+
+        row = res.data[0]
+        if row["evaluation_status"] in ("done", "failed"):
+            return None
+        if row["evaluation_status"] == "running" and row.get("claimed_at"):
+            # Still leased: the sweep offers the row again once the lease runs out
+            lease = timedelta(seconds=get_resources().settings.evaluation_lease_seconds)
+            if datetime.now(timezone.utc) - _utc(row["claimed_at"]) < lease:
+                return None
+
+        # Optimistic claim: only one worker can move attempts from N to N + 1
+        attempts = row.get("attempts") or 0
+        claimed = await run_query(
+            get_supabase_client().table("test_results")
+            .update({
+                "evaluation_status": "running",
+                "attempts": attempts + 1,
+                "claimed_at": datetime.now(timezone.utc).isoformat()
+            })
+            .eq("id", result_id)
+            .eq("attempts", attempts)
+        )
+        if not claimed.data:
+            return None
+
+        row["attempts"] = attempts + 1
+        self._claimed[result_id] = row["attempts"]
+        return row
+
+    async def _process(self, result_id):
+        # Worker logs and outbound model calls are tagged with the submission they belong to
+        request_id_var.set(f"eval-{result_id}")
+        row = await self._claim(result_id)
+        if row is None:
+            return
+
+        try:
+            submission = TestSubmission(**row["submission"])
+            result = await evaluate_test(submission)
+        except Exception as e:
+            result = {"score": 0, "status": "Internal error", "raw_feedback": f"Internal Error: {str(e)}"}
+
+        settings = get_resources().settings
+        if result.get("status") in RETRYABLE_STATUSES and row["attempts"] < settings.evaluation_max_attempts:
+            delay = settings.evaluation_retry_delay * (2 ** (row["attempts"] - 1))
+            logger.info(f"🔁 Evaluation of {result_id} failed ({result.get('status')}), retrying in {delay:.0f}s")
+            await run_query(
+                get_supabase_client().table("test_results")
+                .update({"evaluation_status": "pending", "last_error": result.get("raw_feedback", "")})
+                .eq("id", result_id)
+                .eq("attempts", row["attempts"])
+            )
+            self._claimed.pop(result_id, None)
+            self._schedule_retry(result_id, delay)
+            return
+
+        evaluation_status = "failed" if result.get("status") in RETRYABLE_STATUSES else "done"
+        await run_query(
+            get_supabase_client().table("test_results")
+            .update({
+                "score": result.get("score", 0),
+                "percentage": result.get("percentage", 0.0),
+                "status": result.get("status", "Fail"),
+                "raw_feedback": result.get("raw_feedback", ""),
+                "question_scores": result.get("question_scores"),
+                "evaluation_status": evaluation_status,
+                "evaluated_at": datetime.now(timezone.utc).isoformat()
+            })
+            .eq("id", result_id)
+            # Only while our claim is current; a worker that outlived its lease must not overwrite the reclaim
+            .eq("attempts", row["attempts"])
+        )
+        self._claimed.pop(result_id, None)
+        logger.info(f"✅ Evaluation {result_id} {evaluation_status}: {result.get('score', 0)}")
+
+    def _schedule_retry(self, result_id, delay: float):
+        async def requeue():
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._waiting.discard(result_id)
+            self.enqueue(result_id)
+
+        self._waiting.add(result_id)
+        task = asyncio.create_task(requeue())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+
+evaluation_queue = EvaluationQueue()
@@ -0,0 +1,33 @@
+import httpx
+from config import Settings
+from utils.log import request_id_var
+
+
+async def _propagate_request_id(request: httpx.Request):
+    """Tag outbound calls with the id of the API request that caused them"""
+    request_id = request_id_var.get()
+    if request_id and "X-Request-ID" not in request.headers:
+        request.headers["X-Request-ID"] = request_id
+
+
+def create_http_client(settings: Settings) -> httpx.AsyncClient:
+    """
+    Build an AsyncClient with connection pooling, keep-alive and per-phase timeouts
+    """
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.http_connect_timeout,
+        read=settings.http_read_timeout,
+        write=settings.http_write_timeout,
+        pool=settings.http_pool_timeout,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        event_hooks={"request": [_propagate_request_id]}
+    )
+
@@ -0,0 +1,161 @@
+import time
+import asyncio
+from services.openrouter import RateLimited
+from utils.metrics import model_fallbacks_total
+from utils.log import get_logger
+from resources import get_resources
+
+logger = get_logger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Skip a model after repeated failures. Once open, a single trial call is
+    let through after `reset_seconds`; success closes the breaker again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give back a half-open trial that was cancelled before it finished"""
+        self.trial_in_flight = False
+
+
+breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(model_name: str) -> CircuitBreaker:
+    if model_name not in breakers:
+        settings = get_resources().settings
+        breakers[model_name] = CircuitBreaker(settings.model_breaker_failures, settings.model_breaker_reset_seconds)
+    return breakers[model_name]
+
+
+def breaker_states() -> dict:
+    return {model: {"state": b.state, "failures": b.failures} for model, b in breakers.items()}
+
+
+async def _attempt(call, model_name: str, prompt: str, validate):
+    breaker = get_breaker(model_name)
+    try:
+        result = await call(model_name, prompt)
+    except (asyncio.CancelledError, RateLimited):
+        # Never reached the model (or was cancelled): the breaker's trial is handed back untouched
+        breaker.release()
+        raise
+    except Exception as e:
+        logger.error(f"❌ {model_name} failed: {e}")
+        result = None
+
+    if result is not None and validate(result):
+        breaker.record_success()
+        return result
+
+    breaker.record_failure()
+    if breaker.state != "closed":
+        logger.warning(f"⚡ Circuit open for {model_name} after {breaker.failures} failures")
+    return None
+
+
+async def call_with_fallback(call, prompt: str, validate=bool, models: list[str] | None = None, hedge_delay: float | None = None):
+    """
+    Run `call(model_name, prompt)` across the configured models and return the
+    first result that passes `validate`, or None if every model fails.
+
+    Models with an open circuit are skipped. The next model is launched as
+    soon as the current one fails, or after `hedge_delay` seconds if it is
+    still running; whichever valid response lands first wins and the rest
+    are cancelled. If every launched model was refused by its rate limiter,
+    RateLimited is raised instead of returning None.
+    """
+    settings = get_resources().settings
+    models = models or settings.openrouter_models
+    hedge_delay = settings.model_hedge_delay if hedge_delay is None else hedge_delay
+    # Lazy so a half-open breaker only hands out its trial when that model is actually launched
+    candidates = (m for m in models if get_breaker(m).allow())
+
+    pending = set()
+    rejections = []
+    launched = 0
+
+    def launch_next(reason: str | None = None) -> bool:
+        nonlocal launched
+        model_name = next(candidates, None)
+        if model_name is None:
+            return False
+        if reason:
+            model_fallbacks_total.inc(model_name, reason)
+        if pending:
+            logger.info(f"⏱️ Hedging with {model_name}")
+        pending.add(asyncio.create_task(_attempt(call, model_name, prompt, validate)))
+        launched += 1
+        return True
+
+    if not launch_next():
+        logger.warning("⚠️ All models are circuit-broken, skipping model call")
+        return None
+
+    try:
+        while pending:
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=hedge_delay if hedge_delay > 0 else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                launch_next("hedge")
+                continue
+
+            for task in done:
+                pending.discard(task)
+                try:
+                    result = task.result()
+                except RateLimited as e:
+                    rejections.append(e)
+                    continue
+                if result is not None:
+                    return result
+
+            # Something failed: move on to the next model right away
+            launch_next("failure")
+
+        if rejections and len(rejections) == launched:
+            raise rejections[0]
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
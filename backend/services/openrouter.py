@@ -0,0 +1,228 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from resources import get_resources
+from utils.log import get_logger
+from utils.metrics import llm_request_seconds
+
+logger = get_logger(__name__)
+
+THROTTLE_STATUSES = {429, 503}
+
+
+class RateLimited(Exception):
+    """A model call was refused locally (queue full / deadline) or by the provider after retries"""
+
+    def __init__(self, model_name: str, reason: str, retry_after: float = 0):
+        super().__init__(f"{model_name}: {reason}")
+        self.model_name = model_name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `capacity`; pause() blocks all tokens until a time"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self, deadline: float) -> bool:
+        """Take a token, waiting if needed. False if one can't be had before `deadline`."""
+        while True:
+            wait = self.wait_time()
+            if wait <= 0:
+                self.tokens -= 1
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class ModelLimiter:
+    """Token bucket + max-in-flight semaphore + bounded wait queue for one model"""
+
+    def __init__(self, model_name: str, rate_per_minute: float, burst: int, max_in_flight: int, queue_limit: int):
+        self.model_name = model_name
+        self.bucket = TokenBucket(rate_per_minute / 60, burst)
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.queue_limit = queue_limit
+        self.waiting = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    @asynccontextmanager
+    async def admit(self, deadline: float):
+        if self.waiting >= self.queue_limit:
+            self.rejected += 1
+            raise RateLimited(self.model_name, "queue full", self.bucket.wait_time())
+
+        self.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise RateLimited(self.model_name, "timed out waiting for a slot")
+            if not await self.bucket.acquire(deadline):
+                self.semaphore.release()
+                self.rejected += 1
+                raise RateLimited(self.model_name, "rate limit", self.bucket.wait_time())
+        finally:
+            self.waiting -= 1
+
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def throttle(self, seconds: float):
+        """The provider said slow down: stop handing out tokens for `seconds`"""
+        self.throttled += 1
+        self.bucket.pause(seconds)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "tokens": round(self.bucket.tokens, 2)
+        }
+
+
+limiters: dict[str, ModelLimiter] = {}
+
+
+def get_limiter(model_name: str) -> ModelLimiter:
+    if model_name not in limiters:
+        settings = get_resources().settings
+        limiters[model_name] = ModelLimiter(
+            model_name,
+            rate_per_minute=settings.openrouter_rate_per_minute,
+            burst=settings.openrouter_burst,
+            max_in_flight=settings.openrouter_max_in_flight,
+            queue_limit=settings.openrouter_queue_limit
+        )
+    return limiters[model_name]
+
+
+def limiter_stats() -> dict:
+    return {model: limiter.stats() for model, limiter in limiters.items()}
+
+
+def _outcome(status_code: int) -> str:
+    if status_code == 200:
+        return "ok"
+    if status_code in THROTTLE_STATUSES:
+        return "throttled"
+    return f"http_{status_code}"
+
+
+def retry_after_seconds(response, attempt: int, retry_base: float) -> float:
+    """Retry-After as seconds or an HTTP date; exponential back-off if the header is missing"""
+    value = response.headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return retry_base * (2 ** attempt)
+
+
+async def post_chat(body: dict, headers: dict, timeout: float | None = None):
+    """
+    POST a chat completion through the model's limiter.
+    429/503 responses pause the model's bucket for Retry-After and are retried
+    while the deadline allows. Raises RateLimited instead of waiting past it.
+    """
+    model_name = body["model"]
+    limiter = get_limiter(model_name)
+    resources = get_resources()
+    settings = resources.settings
+    deadline = time.monotonic() + (settings.openrouter_queue_timeout if timeout is None else timeout)
+
+    for attempt in range(settings.openrouter_max_retries + 1):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with limiter.admit(deadline):
+                started = time.perf_counter()  # provider latency only, not time spent queued
+                response = await resources.http.post(settings.openrouter_url, headers=headers, json=body)
+            outcome = _outcome(response.status_code)
+        except RateLimited:
+            outcome = "rejected"
+            raise
+        finally:
+            llm_request_seconds.observe(time.perf_counter() - started, model_name, outcome)
+
+        if response.status_code not in THROTTLE_STATUSES:
+            return response
+
+        retry_after = retry_after_seconds(response, attempt, settings.openrouter_retry_base)
+        limiter.throttle(retry_after)
+        logger.warning(f"🚦 {model_name} throttled ({response.status_code}), retry after {retry_after:.1f}s")
+        if attempt == settings.openrouter_max_retries or time.monotonic() + retry_after > deadline:
+            raise RateLimited(model_name, f"provider returned {response.status_code}", retry_after)
+
+    return response
+
+
+@asynccontextmanager
+async def stream_chat(body: dict, headers: dict, timeout: float | None = None):
+    """Open a streaming chat completion once the model's limiter admits it (no retries mid-stream)"""
+    model_name = body["model"]
+    limiter = get_limiter(model_name)
+    resources = get_resources()
+    settings = resources.settings
+    deadline = time.monotonic() + (settings.openrouter_queue_timeout if timeout is None else timeout)
+
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        async with limiter.admit(deadline):
+            started = time.perf_counter()
+            async with resources.http.stream("POST", settings.openrouter_url, headers=headers, json=body) as response:
+                outcome = _outcome(response.status_code)
+                if response.status_code in THROTTLE_STATUSES:
+                    retry_after = retry_after_seconds(response, 0, settings.openrouter_retry_base)
+                    limiter.throttle(retry_after)
+                    raise RateLimited(model_name, f"provider returned {response.status_code}", retry_after)
+                yield response
+    except RateLimited:
+        if outcome == "error":
+            outcome = "rejected"
+        raise
+    finally:
+        # Covers the whole stream, since that is how long the caller waited
+        llm_request_seconds.observe(time.perf_counter() - started, model_name, f"stream_{outcome}")
@@ -0,0 +1,87 @@
+import hashlib
+from datetime import datetime
+from db.supabase import get_supabase_client, run_query
+from utils.text_utils import normalize_text
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def question_kind(question: dict) -> str:
+    return "mcq" if question.get("options") else "coding"
+
+
+def bank_key(job_summary: str, difficulty: str, kind: str) -> str:
+    """Stable key for banked questions generated from the same summary and parameters"""
+    raw = "\x1f".join([normalize_text(job_summary), normalize_text(difficulty), kind])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def take_questions(job_summary: str, difficulty: str, kind: str, count: int) -> list:
+    """
+    Claim up to `count` unserved banked questions and mark them served.
+    Returns an empty list if the bank is unavailable.
+    """
+    if count <= 0:
+        return []
+
+    key = bank_key(job_summary, difficulty, kind)
+    try:
+        res = await run_query(
+            get_supabase_client().table("question_bank")
+            .select("id")
+            .eq("bank_key", key)
+            .is_("served_at", "null")
+            .order("created_at")
+            .limit(count)
+        )
+        ids = [row["id"] for row in res.data or []]
+        if not ids:
+            return []
+
+        # Only rows still unserved are claimed, so concurrent requests never share a question
+        claimed = await run_query(
+            get_supabase_client().table("question_bank")
+            .update({"served_at": datetime.utcnow().isoformat()})
+            .in_("id", ids)
+            .is_("served_at", "null")
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Question bank lookup failed: {e}")
+        return []
+
+    return [
+        {
+            "question": row["question"],
+            "options": row.get("options"),
+            "answer": row.get("answer"),
+            "test_cases": row.get("test_cases")
+        }
+        for row in claimed.data or []
+    ]
+
+
+async def store_questions(job_summary: str, difficulty: str, spare: list):
+    """
+    Bank spare generated questions for later requests. Questions already handed to
+    HR are not stored: take_questions only ever reads unserved rows.
+    """
+    rows = []
+    for q in spare:
+        kind = question_kind(q)
+        rows.append({
+            "bank_key": bank_key(job_summary, difficulty, kind),
+            "kind": kind,
+            "question": q["question"],
+            "options": q.get("options"),
+            "answer": q.get("answer"),
+            "test_cases": q.get("test_cases")
+        })
+
+    if not rows:
+        return
+
+    try:
+        await run_query(get_supabase_client().table("question_bank").insert(rows))
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to bank generated questions: {e}")
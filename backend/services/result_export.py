@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+import zlib
+import asyncio
+from typing import AsyncIterator
+from db.supabase import run_query
+from resources import get_resources
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Response field -> test_results column. raw_feedback and question_scores are large,
+# so they are only selected when asked for via `fields`.
+RESULT_FIELDS = {
+    "result_id": "id",
+    "test_id": "question_set_id",
+    "score": "score",
+    "max_score": "max_score",
+    "percentage": "percentage",
+    "status": "status",
+    "duration_used_minutes": "duration_used_minutes",
+    "duration_used_seconds": "duration_used_seconds",
+    "submitted_at": "created_at",
+    "evaluation_status": "evaluation_status",
+    "raw_feedback": "raw_feedback",
+    "question_scores": "question_scores"
+}
+# test_id is implied on the per-test endpoints
+DEFAULT_RESULT_FIELDS = [f for f in RESULT_FIELDS if f not in ("test_id", "raw_feedback", "question_scores")]
+
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+async def iter_result_rows(
+    db,
+    fields: list,
+    test_id: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    page_size: int | None = None
+) -> AsyncIterator[dict]:
+    """
+    Matching test_results rows, oldest first, keyset paged on (created_at, id).
+    The next page is fetched while the current one is being sent.
+    Worker memory is bounded by about two pages (export_page_size) whatever the result count.
+    """
+    page_size = page_size or get_resources().settings.export_page_size
+    # id and created_at are always needed to build the cursor
+    columns = ", ".join(sorted({RESULT_FIELDS[f] for f in fields} | {"id", "created_at"}))
+
+    async def fetch(cursor: tuple | None) -> list:
+        query = db.table("test_results").select(columns)
+        if test_id:
+            query = query.eq("question_set_id", test_id)
+        if since:
+            query = query.gte("created_at", since)
+        if until:
+            query = query.lt("created_at", until)
+        if cursor:
+            created_at, result_id = cursor
+            query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{result_id})')
+        res = await run_query(query.order("created_at").order("id").limit(page_size))
+        return res.data or []
+
+    page = await fetch(None)
+    while page:
+        upcoming = None
+        if len(page) == page_size:
+            upcoming = asyncio.create_task(fetch((page[-1]["created_at"], page[-1]["id"])))
+        try:
+            for row in page:
+                yield {f: row.get(RESULT_FIELDS[f]) for f in fields}
+        except BaseException:
+            # Client went away mid-page: don't leave the prefetch dangling
+            if upcoming is not None:
+                upcoming.cancel()
+            raise
+        page = await upcoming if upcoming is not None else []
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def encode_results(rows: AsyncIterator[dict], fields: list, fmt: str, compress: bool = False) -> AsyncIterator[bytes]:
+    """Serialize rows as CSV (with a header) or NDJSON, optionally gzipped, in ~export_chunk_bytes chunks"""
+    chunk_bytes = get_resources().settings.export_chunk_bytes
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(fields)
+    count = 0
+
+    def take() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return gzip.compress(data) if gzip else data
+
+    async for row in rows:
+        count += 1
+        if writer:
+            writer.writerow([_csv_value(row[f]) for f in fields])
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        if buffer.tell() >= chunk_bytes:
+            chunk = take()
+            if chunk:
+                yield chunk
+
+    tail = take() + (gzip.flush() if gzip else b"")
+    if tail:
+        yield tail
+    logger.info(f"📤 Exported {count} results as {fmt}{' (gzip)' if gzip else ''}")
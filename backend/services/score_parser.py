@@ -0,0 +1,108 @@
+import re
+import json
+
+# Precompiled, line-anchored fallbacks for free-text output. No DOTALL: each
+# match is confined to one line so long feedback can't cause backtracking.
+# A "Score: X/10" on the line wins over any earlier bare "N/10" (e.g. "covers 3/10 cases").
+_QUESTION_SCORE = re.compile(
+    r"^[\s*#>\-]*(?:Q|Question)\s*(\d+)\b"
+    r"(?:[^\n]*?\bScore\**\s*[:=]?\s*\**\s*(\d+(?:\.\d+)?)\s*/\s*10\b|[^\n]*?(\d+(?:\.\d+)?)\s*/\s*10\b)",
+    re.IGNORECASE | re.MULTILINE
+)
+_TOTAL_SCORE = re.compile(
+    r"\bTOTAL(?:\s+SCORE)?\s*:?\s*\**\s*(\d+(?:\.\d+)?)\s*/\s*(\d+)",
+    re.IGNORECASE
+)
+_CODE_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+
+
+def _clamp_score(value) -> int:
+    return max(0, min(10, round(float(value))))
+
+
+def _parse_json(content: str, question_numbers: list[int]):
+    start = content.find("{")
+    end = content.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(_CODE_FENCE.sub("", content[start:end + 1]))
+    except (json.JSONDecodeError, ValueError):
+        return None
+
+    entries = data.get("scores") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        return None
+
+    scores, feedback = {}, {}
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict) or "score" not in entry:
+            continue
+        try:
+            q = int(entry.get("q", entry.get("question", question_numbers[position] if position < len(question_numbers) else 0)))
+            score = _clamp_score(entry["score"])
+        except (TypeError, ValueError):
+            continue
+        if q in question_numbers:
+            scores[q] = score
+            if entry.get("feedback"):
+                feedback[q] = str(entry["feedback"]).strip()
+
+    return (scores, feedback) if scores else None
+
+
+def parse_scores(content: str, question_numbers: list[int]) -> dict:
+    """
+    Parse per-question scores out of a model response in a single pass.
+
+    Tries, in order: the structured JSON the evaluator asks for, per-question
+    "Qn ... X/10" lines, then a "TOTAL SCORE: X/Y" line (scaled to the
+    expected maximum). Never guesses a score that isn't in the text.
+
+    Returns: {"scores": {q: score}, "feedback": {q: text}, "total": int,
+              "max_score": int, "strategy": str}
+    """
+    max_score = len(question_numbers) * 10
+    content = content or ""
+
+    parsed = _parse_json(content, question_numbers)
+    if parsed:
+        scores, feedback = parsed
+        strategy = "json" if len(scores) == len(question_numbers) else "json_partial"
+        return {
+            "scores": scores,
+            "feedback": feedback,
+            "total": sum(scores.values()),
+            "max_score": max_score,
+            "strategy": strategy
+        }
+
+    scores = {}
+    for match in _QUESTION_SCORE.finditer(content):
+        q = int(match.group(1))
+        if q in question_numbers and q not in scores:
+            scores[q] = _clamp_score(match.group(2) or match.group(3))
+    if scores:
+        return {
+            "scores": scores,
+            "feedback": {},
+            "total": sum(scores.values()),
+            "max_score": max_score,
+            "strategy": "per_question" if len(scores) == len(question_numbers) else "per_question_partial"
+        }
+
+    match = _TOTAL_SCORE.search(content)
+    if match and int(match.group(2)) > 0:
+        total = float(match.group(1))
+        stated_max = int(match.group(2))
+        if stated_max != max_score:
+            total = total * max_score / stated_max
+        return {
+            "scores": {},
+            "feedback": {},
+            "total": max(0, min(max_score, round(total))),
+            "max_score": max_score,
+            "strategy": "total"
+        }
+
+    return {"scores": {}, "feedback": {}, "total": 0, "max_score": max_score, "strategy": "none"}
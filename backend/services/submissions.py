@@ -0,0 +1,63 @@
+import json
+import asyncio
+import hashlib
+from fastapi.encoders import jsonable_encoder
+from db.supabase import get_supabase_client, run_query
+from schemas.test_schemas import TestSubmission
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+RESULT_COLUMNS = (
+    "id, evaluation_status, attempts, score, max_score, percentage, status, raw_feedback, "
+    "question_scores, total_questions, duration_used_minutes, created_at, evaluated_at"
+)
+
+# Inserts still running in this worker, by idempotency key
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def submission_key(submission: TestSubmission, client_key: str | None = None) -> str:
+    """
+    Idempotency key of a submission. A client key is scoped to its test; without
+    one the key is a hash of the whole payload (duration_used included, so two
+    candidates with identical answers are still told apart).
+    """
+    if client_key:
+        raw = f"client|{submission.question_set_id}|{client_key.strip()}"
+    else:
+        raw = "content|" + json.dumps(jsonable_encoder(submission), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def _insert_once(key: str, row: dict) -> tuple:
+    db = get_supabase_client()
+    res = await run_query(
+        db.table("test_results").upsert({**row, "idempotency_key": key}, on_conflict="idempotency_key", ignore_duplicates=True)
+    )
+    if res.data:
+        return res.data[0], True
+
+    # Another request (possibly on another worker) stored this submission first
+    existing = await run_query(db.table("test_results").select(RESULT_COLUMNS).eq("idempotency_key", key))
+    if not existing.data:
+        raise RuntimeError("submission conflicted but the stored row was not found")
+    return existing.data[0], False
+
+
+async def store_submission(key: str, row: dict) -> tuple:
+    """
+    Insert a test_results row once per idempotency key.
+    Returns (row, created); concurrent duplicates in this worker share one insert,
+    later ones get the stored row.
+    """
+    pending = _inflight.get(key)
+    if pending is not None:
+        stored, _ = await asyncio.shield(pending)
+        return stored, False
+
+    task = asyncio.ensure_future(_insert_once(key, row))
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded: a client disconnect must not abandon an insert others are waiting on
+    return await asyncio.shield(task)
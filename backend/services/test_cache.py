@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from db.supabase import get_supabase_client, run_query
+from resources import get_resources
+
+# Question sets are immutable once finalized, so candidate fetches are served from
+# memory (resources.test_cache). Entries never outlive the set's expires_at and are
+# dropped on delete/extend.
+
+
+async def load_test(question_set_id: str):
+    """
+    Load a question set and its candidate-facing questions.
+    Returns None if the set does not exist.
+    """
+    db = get_supabase_client()
+    res = await run_query(db.table("question_sets").select("*").eq("id", question_set_id))
+    if not res.data:
+        return None
+
+    q_res = await run_query(db.table("questions").select("question, options").eq("question_set_id", question_set_id))
+
+    test_info = res.data[0]
+    return {
+        "expires_at": test_info.get("expires_at"),
+        "duration": test_info.get("duration", 20),
+        "questions": q_res.data or []
+    }
+
+
+def _seconds_to_keep(test):
+    """Cache until the set expires (capped by the test cache TTL); skip missing or empty sets"""
+    if not test or not test["questions"]:
+        return 0
+    remaining = (datetime.fromisoformat(test["expires_at"]) - datetime.now(timezone.utc)).total_seconds()
+    return min(get_resources().settings.test_cache_ttl, remaining)
+
+
+async def get_test(question_set_id: str):
+    return await get_resources().test_cache.get_or_load(
+        question_set_id,
+        lambda: load_test(question_set_id),
+        ttl=_seconds_to_keep
+    )
+
+
+def invalidate_test(question_set_id: str):
+    get_resources().test_cache.invalidate(question_set_id)
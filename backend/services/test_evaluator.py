@@ -1,13 +1,225 @@
-import os
 import httpx
 import re
+import asyncio
 from schemas.test_schemas import TestSubmission
-from dotenv import load_dotenv
+from db.supabase import get_supabase_client, run_query
+from services.openrouter import RateLimited, post_chat
+from services.score_parser import parse_scores
+from services.code_runner import run_test_cases
+from services.evaluation_cache import normalize_code, evaluation_key, lookup_evaluations, store_evaluations
+from utils.text_utils import normalize_text, estimate_tokens
+from utils.metrics import score_parse_total
+from utils.log import get_logger, log_payload
+from resources import get_resources
 
-load_dotenv()
+logger = get_logger(__name__)
 
-async def evaluate_test(submission: TestSubmission):
-    # Enhanced prompt with clearer instructions
+_LETTER_ONLY = re.compile(r"^\(?([a-z])[\).:]?$")
+_LABEL_PREFIX = re.compile(r"^\(?[a-z][\).:]\s+")
+
+
+def _resolve_option(answer, options: list[str]) -> str:
+    """Map a letter answer ("B", "b)") to its option text and drop "B) " style labels"""
+    norm = normalize_text(answer)
+    match = _LETTER_ONLY.match(norm)
+    if match:
+        idx = ord(match.group(1)) - ord("a")
+        if 0 <= idx < len(options):
+            norm = normalize_text(options[idx])
+    return _LABEL_PREFIX.sub("", norm)
+
+
+def is_correct_mcq(candidate_answer, correct_answer, options: list[str]) -> bool:
+    """Exact-match an MCQ answer against the stored correct option"""
+    if not normalize_text(candidate_answer):
+        return False
+    return _resolve_option(candidate_answer, options) == _resolve_option(correct_answer, options)
+
+
+async def fetch_answer_key(question_set_id: str) -> dict:
+    """
+    Load the stored options, correct answers and test cases for a question set.
+    MCQs are graded against these, never against what the submission carries.
+    Returns: {normalized question text: {"options": [...], "answer": ..., "test_cases": [...]}}
+    """
+    try:
+        res = await run_query(
+            get_supabase_client().table("questions").select("question, options, answer, test_cases").eq("question_set_id", question_set_id)
+        )
+    except Exception as e:
+        logger.error(f"❌ Failed to load answer key for {question_set_id}: {e}")
+        return {}
+
+    return {
+        normalize_text(row["question"]): {
+            "options": row.get("options") or [],
+            "answer": row.get("answer"),
+            "test_cases": row.get("test_cases") or []
+        }
+        for row in (res.data or [])
+        if row.get("answer") or row.get("test_cases")
+    }
+
+
+async def run_coding_checks(submission: TestSubmission, answer_key: dict) -> dict:
+    """
+    Execute coding answers against their stored test cases, all questions at once.
+    Returns: {question number: {"passed": int, "total": int, "cases": [...]}}
+    Questions without test cases or in a language we can't run are left out.
+    """
+    languages = submission.languages or []
+    jobs = {}
+    for i, (question, answer) in enumerate(zip(submission.questions, submission.answers), 1):
+        # Whether it's a coding question comes from the stored row, not the submission
+        stored = answer_key.get(normalize_text(question.question), {})
+        if stored.get("options"):
+            continue
+        test_cases = stored.get("test_cases")
+        language = languages[i - 1] if i - 1 < len(languages) else None
+        if test_cases and answer and language:
+            jobs[i] = run_test_cases(answer, language, test_cases)
+
+    if not jobs:
+        return {}
+
+    results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+    checks = {}
+    for i, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            logger.warning(f"⚠️ Running test cases for Q{i} failed: {result}")
+        elif result is not None:
+            checks[i] = result
+    return checks
+
+
+def format_feedback(question_results: dict) -> str:
+    """One 'Qn - Type: T - Score: X/10' line per question (the result page parses these)"""
+    lines = []
+    for i in sorted(question_results):
+        result = question_results[i]
+        line = f"Q{i} - Type: {result['type']} - Score: {result['score']}/10"
+        if result.get("feedback"):
+            line += f" - {result['feedback']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def build_result(question_results: dict, max_score: int, unattributed_score: int = 0, parse_strategy: str = None) -> dict:
+    """
+    Combine per-question results into the final score.
+    `unattributed_score` covers model output that only gave a total.
+    """
+    score = sum(r["score"] for r in question_results.values()) + unattributed_score
+    percentage = (score / max_score * 100) if max_score > 0 else 0
+    status = "Pass" if percentage >= 50 else "Fail"
+
+    logger.info(f"📊 Final Score: {score}/{max_score} ({percentage:.1f}%) - Status: {status}")
+    score_parse_total.inc(parse_strategy or "none")
+
+    return {
+        "score": score,
+        "max_score": max_score,
+        "percentage": percentage,
+        "status": status,
+        "raw_feedback": f"{format_feedback(question_results)}\n\nTOTAL SCORE: {score}/{max_score}".strip(),
+        "question_scores": {str(i): r["score"] for i, r in question_results.items()},
+        "parse_strategy": parse_strategy
+    }
+
+
+def failed_result(question_results: dict, max_score: int, status: str, error: str) -> dict:
+    """Evaluation could not finish: keep what was graded locally and record the error"""
+    return {
+        "score": sum(r["score"] for r in question_results.values()),
+        "max_score": max_score,
+        "status": status,
+        "raw_feedback": f"{format_feedback(question_results)}\n{error}".strip(),
+        "question_scores": {str(i): r["score"] for i, r in question_results.items()}
+    }
+
+
+def apply_model_score(question_results: dict, i: int, question, score: int, feedback: str, code_checks: dict):
+    """Record a model score; for test-checked code it only covers the quality share"""
+    if i in code_checks:
+        result = question_results[i]
+        # Share of a coding question's 10 points decided by its test cases; the model scores the rest
+        quality_points = 10 - get_resources().settings.code_correctness_points
+        result["score"] = result["correctness"] + round(quality_points * score / 10)
+        if feedback:
+            result["feedback"] += f"; {feedback}"
+    else:
+        question_results[i] = {
+            "type": "MCQ" if question.options else "Coding",
+            "score": score,
+            "feedback": feedback
+        }
+
+
+def cache_key_for(question, answer, code_checks: dict, i: int) -> str:
+    options = question.options or []
+    if options:
+        normalized = _resolve_option(answer, options)
+    else:
+        normalized = normalize_code(answer)
+    mode = "quality" if i in code_checks else "full"
+    return evaluation_key(question.question, options, normalized, mode)
+
+
+class EvaluationAPIError(Exception):
+    """The model API answered with a non-200 status"""
+
+
+def truncate_answer(answer, max_tokens: int, policy: str = "head_tail") -> tuple:
+    """
+    Cut an answer down to about `max_tokens`. "head" keeps the start; "head_tail"
+    keeps the start and the end (where code usually prints or returns).
+    Returns: (text, characters omitted)
+    """
+    text = str(answer or "")
+    if estimate_tokens(text) <= max_tokens:
+        return text, 0
+
+    budget = max_tokens * 4
+    if policy == "head":
+        head, tail = text[:budget], ""
+    else:
+        head, tail = text[:budget * 2 // 3], text[-(budget // 3):]
+        # Cut on line boundaries so the model never sees half a statement
+        tail = tail[tail.find("\n") + 1:] if "\n" in tail else tail
+    head = head[:head.rfind("\n")] if "\n" in head else head
+    omitted = len(text) - len(head) - len(tail)
+    marker = f"\n... [{omitted} characters omitted] ...\n"
+    return head + marker + tail, omitted
+
+
+def item_tokens(question, answer) -> int:
+    """Prompt tokens one question takes once its answer is truncated"""
+    options = question.options or []
+    answer_tokens = min(estimate_tokens(answer), get_resources().settings.evaluation_answer_max_tokens)
+    return estimate_tokens(question.question) + estimate_tokens(", ".join(options)) + answer_tokens + 20
+
+
+def plan_batches(llm_items: list) -> list:
+    """
+    Group (i, question, answer) items in order so each batch stays within the
+    evaluation_batch_token_budget and evaluation_batch_max_questions settings.
+    An item bigger than the budget on its own gets a batch to itself.
+    """
+    settings = get_resources().settings
+    batches, current, used = [], [], 0
+    for item in llm_items:
+        tokens = item_tokens(item[1], item[2])
+        if current and (used + tokens > settings.evaluation_batch_token_budget or len(current) >= settings.evaluation_batch_max_questions):
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_batch_prompt(batch: list, code_checks: dict) -> str:
     prompt = (
         "You are an expert HR evaluator tasked with scoring a candidate's test submission.\n\n"
         "Each question is either:\n"
@@ -24,38 +236,49 @@ async def evaluate_test(submission: TestSubmission):
         "       - 8/10: Correct output, minor inefficiencies or style issues.\n"
         "       - 6/10: Mostly correct, but logic can be improved.\n"
         "       - 4/10: Partially working code, poor logic or structure.\n"
-        "       - 2/10 or 0/10: Wrong, incomplete, or irrelevant code.\n\n"
-        "**You MUST follow this exact output format**:\n"
-        "Q1 - Type: MCQ - Score: X/10\n"
-        "Q2 - Type: Coding - Score: X/10\n"
-        "...\n\n"
-        "At the end, provide ONLY:\n"
-        "TOTAL SCORE: X/Y\n"
-        "STATUS: Pass (if X >= 50% of Y) or Fail\n\n"
-        f"Number of Questions: {len(submission.questions)}\n"
-        f"Maximum Possible Score: {len(submission.questions) * 10}\n\n"
+        "       - 2/10 or 0/10: Wrong, incomplete, or irrelevant code.\n"
+        "   - If a question says **Correctness already verified**, its answer was run against test cases: "
+        "score ONLY code quality (readability, structure, efficiency) from 0 to 10.\n"
+        "   - Long answers may be shortened with a \"[... characters omitted]\" marker: judge the code shown "
+        "and do not penalize the omission itself.\n\n"
+        "**You MUST respond with ONLY this JSON and nothing else**:\n"
+        '{"scores": [{"q": 1, "type": "MCQ", "score": X, "feedback": "one short sentence"}, '
+        '{"q": 2, "type": "Coding", "score": X, "feedback": "one short sentence"}]}\n'
+        "Use the question numbers exactly as given below. Each score is an integer from 0 to 10.\n\n"
+        f"Number of Questions: {len(batch)}\n"
+        f"Maximum Possible Score: {len(batch) * 10}\n\n"
         "Evaluate the following Questions and Answers:\n"
     )
 
-    
-    # Add each question and answer pair with clear formatting
-    for i, (question, answer) in enumerate(zip(submission.questions, submission.answers), 1):
-        # Handle Question object (Pydantic model)
-        question_text = question.question
+    settings = get_resources().settings
+    for i, question, answer in batch:
         options = question.options or []
-        
-        prompt += f"\nQ{i}: {question_text}\n"
-        if options and len(options) > 0:
+        prompt += f"\nQ{i}: {question.question}\n"
+        if options:
             prompt += f"Options: {', '.join(options)}\n"
-            prompt += f"Type: MCQ\n"
+            prompt += "Type: MCQ\n"
         else:
-            prompt += f"Type: Coding\n"
-        
-        prompt += f"Candidate's Answer: {answer}\n"
+            prompt += "Type: Coding\n"
+            check = code_checks.get(i)
+            if check:
+                prompt += f"Correctness already verified: {check['passed']}/{check['total']} test cases passed\n"
+
+        text, omitted = truncate_answer(answer, settings.evaluation_answer_max_tokens, settings.evaluation_truncation_policy)
+        if omitted:
+            logger.info(f"✂️ Q{i}: answer truncated ({omitted} characters omitted)")
+        prompt += f"Candidate's Answer: {text}\n"
         prompt += "---\n"
+    return prompt
 
+
+async def score_batch(batch: list, code_checks: dict) -> dict:
+    """
+    Score one batch with the model. Returns parse_scores() output;
+    raises RateLimited, httpx.RequestError or EvaluationAPIError.
+    """
+    settings = get_resources().settings
     headers = {
-        "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
+        "Authorization": f"Bearer {settings.openrouter_api_key}",
         "HTTP-Referer": "https://your-actual-domain.com",
         "X-Title": "Test Evaluation",
         "Content-Type": "application/json"
@@ -63,135 +286,163 @@ async def evaluate_test(submission: TestSubmission):
 
     payload = {
         "model": "mistralai/mistral-7b-instruct:free",
-        "messages": [{"role": "user", "content": prompt}],
+        "messages": [{"role": "user", "content": build_batch_prompt(batch, code_checks)}],
         "temperature": 0.1,  # Lower temperature for more consistent scoring
-        "max_tokens": 2000
+        # Sized to the batch so the scores JSON is never cut off
+        "max_tokens": min(settings.evaluation_max_output_tokens, 100 + settings.evaluation_output_tokens_per_question * len(batch))
     }
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                json=payload,
-                headers=headers,
-                timeout=60
-            )
-
-            if response.status_code != 200:
-                error_data = response.json().get("error", {})
-                print(f"⚠️ Evaluation API error: {response.status_code} - {error_data.get('message', 'Unknown error')}")
-                return {
-                    "score": 0, 
-                    "max_score": len(submission.questions) * 10, 
-                    "status": "Evaluation failed", 
-                    "raw_feedback": f"API Error: {error_data.get('message', 'Unknown error')}"
-                }
-
-            content = response.json()["choices"][0]["message"]["content"]
-            print("📬 Raw model output:\n", content)
-
-            # Enhanced score extraction with multiple patterns
-            score, max_score = extract_score_from_response(content, len(submission.questions))
-            
-            # Calculate percentage and determine status
-            percentage = (score / max_score * 100) if max_score > 0 else 0
-            status = "Pass" if percentage >= 50 else "Fail"
-            
-            print(f"📊 Extracted Score: {score}/{max_score} ({percentage:.1f}%) - Status: {status}")
-
-            return {
-                "score": score,
-                "max_score": max_score,
-                "percentage": percentage,
-                "status": status,
-                "raw_feedback": content
-            }
+    # Shared per-model limiter: paces calls and backs off on 429 instead of failing the submission
+    response = await post_chat(payload, headers)
 
-    except httpx.RequestError as e:
-        print(f"❌ HTTP error during evaluation: {e}")
-        return {
-            "score": 0, 
-            "max_score": len(submission.questions) * 10, 
-            "status": "Network error", 
-            "raw_feedback": f"HTTP Error: {str(e)}"
-        }
+    if response.status_code != 200:
+        error_data = response.json().get("error", {})
+        message = error_data.get("message", "Unknown error")
+        logger.warning(f"⚠️ Evaluation API error: {response.status_code} - {message}")
+        raise EvaluationAPIError(message)
 
-    except Exception as e:
-        print(f"❌ Unexpected error: {e}")
-        return {
-            "score": 0, 
-            "max_score": len(submission.questions) * 10, 
-            "status": "Internal error", 
-            "raw_feedback": f"Internal Error: {str(e)}"
-        }
+    content = response.json()["choices"][0]["message"]["content"]
+    log_payload(logger, "📬 Raw model output", content)
+
+    # Structured JSON first, precompiled free-text patterns as fallback
+    parsed = parse_scores(content, [i for i, _, _ in batch])
+    logger.info(f"🔍 Parsed {len(parsed['scores'])}/{len(batch)} scores via '{parsed['strategy']}'")
+    return parsed
 
 
-def extract_score_from_response(content: str, num_questions: int) -> tuple[int, int]:
+async def score_items(llm_items: list, code_checks: dict) -> list:
     """
-    Extract score from LLM response using multiple parsing strategies
-    Returns: (score, max_score)
+    Score (i, question, answer) items in budgeted batches, up to evaluation_batch_concurrency at once.
+    Returns: [(batch, parse_scores() output or the exception it raised)]
     """
-    max_score = num_questions * 10
-    
-    print(f"🔍 Attempting to extract score from response (expected max: {max_score})")
-    
-    # Strategy 1: Look for "TOTAL SCORE: X/Y" pattern
-    total_patterns = [
-        r"TOTAL SCORE:\s*(\d+)/(\d+)",
-        r"TOTAL SCORE:\s*(\d+)\s*/\s*(\d+)",
-        r"Total Score:\s*(\d+)/(\d+)",
-        r"Total:\s*(\d+)/(\d+)"
-    ]
-    
-    for pattern in total_patterns:
-        match = re.search(pattern, content, re.IGNORECASE)
-        if match:
-            score = int(match.group(1))
-            extracted_max = int(match.group(2))
-            print(f"✅ Found total score pattern '{pattern}': {score}/{extracted_max}")
-            return score, extracted_max
-
-    # Strategy 2: Sum individual question scores
-    question_patterns = [
-        r"Q(\d+).*?Score:\s*(\d+)/10",
-        r"Question\s*(\d+).*?Score:\s*(\d+)/10",
-        r"Q(\d+).*?(\d+)/10"
-    ]
-    
-    for pattern in question_patterns:
-        matches = re.findall(pattern, content, re.IGNORECASE | re.DOTALL)
-        if matches and len(matches) == num_questions:
-            total_score = sum(int(match[1]) for match in matches)
-            print(f"✅ Calculated from individual scores using pattern '{pattern}': {[match[1] for match in matches]} = {total_score}/{max_score}")
-            return total_score, max_score
-
-    # Strategy 3: Look for individual scores without question numbers
-    score_matches = re.findall(r"Score:\s*(\d+)/10", content, re.IGNORECASE)
-    if score_matches and len(score_matches) == num_questions:
-        total_score = sum(int(score) for score in score_matches)
-        print(f"✅ Calculated from individual scores: {score_matches} = {total_score}/{max_score}")
-        return total_score, max_score
-
-    # Strategy 4: Look for any reasonable X/Y pattern
-    all_score_patterns = re.findall(r"(\d+)\s*/\s*(\d+)", content)
-    for score_str, max_str in all_score_patterns:
-        potential_score = int(score_str)
-        potential_max = int(max_str)
-        
-        # Check if this looks like a reasonable total score
-        if potential_max == max_score and 0 <= potential_score <= potential_max:
-            print(f"✅ Found reasonable score pattern: {potential_score}/{potential_max}")
-            return potential_score, potential_max
-
-    # Strategy 5: Look for status and try to infer
-    if "pass" in content.lower():
-        # If it says pass, assume at least 50%
-        min_pass_score = max_score // 2
-        print(f"⚠️ Found 'Pass' status, inferring minimum passing score: {min_pass_score}/{max_score}")
-        return min_pass_score, max_score
-    
-    # Fallback: return 0 if nothing found
-    print("❌ Could not extract score from response, defaulting to 0")
-    print("📄 Response content for debugging:")
-    print(content[:500] + "..." if len(content) > 500 else content)
-    return 0, max_score
\ No newline at end of file
+    batches = plan_batches(llm_items)
+    semaphore = asyncio.Semaphore(get_resources().settings.evaluation_batch_concurrency)
+
+    async def score_with_limit(batch):
+        async with semaphore:
+            return await score_batch(batch, code_checks)
+
+    outcomes = await asyncio.gather(*(score_with_limit(batch) for batch in batches), return_exceptions=True)
+    return list(zip(batches, outcomes))
+
+
+# Least to most reliable; a multi-batch evaluation reports its weakest batch
+_STRATEGY_ORDER = ["none", "total", "per_question_partial", "per_question", "json_partial", "json"]
+
+
+def weakest_strategy(strategies: list) -> str:
+    if not strategies:
+        return "none"
+    return min(strategies, key=lambda s: _STRATEGY_ORDER.index(s) if s in _STRATEGY_ORDER else 0)
+
+
+def batch_failure_result(question_results: dict, max_score: int, error: BaseException) -> dict:
+    """Map the first failed batch to the retryable statuses the evaluation queue knows"""
+    if isinstance(error, RateLimited):
+        logger.warning(f"🚦 Evaluation deferred: {error}")
+        return failed_result(question_results, max_score, "Rate limited", f"Rate limited: {error.reason}")
+    if isinstance(error, EvaluationAPIError):
+        return failed_result(question_results, max_score, "Evaluation failed", f"API Error: {error}")
+    if isinstance(error, httpx.RequestError):
+        logger.error(f"❌ HTTP error during evaluation: {error!r}")
+        return failed_result(question_results, max_score, "Network error", f"HTTP Error: {str(error)}")
+    logger.error(f"❌ Unexpected error: {error}")
+    return failed_result(question_results, max_score, "Internal error", f"Internal Error: {str(error)}")
+
+
+async def evaluate_test(submission: TestSubmission):
+    max_score = len(submission.questions) * 10
+    answer_key = await fetch_answer_key(str(submission.question_set_id))
+    code_checks = await run_coding_checks(submission, answer_key)
+
+    # MCQs with a stored answer are graded here, against the stored options (the
+    # submission's own options could be reordered or rewritten); everything else goes to the model.
+    # Coding answers that were run keep their test-case points and only get a quality score from the model.
+    question_results = {}
+    llm_items = []
+    for i, (question, answer) in enumerate(zip(submission.questions, submission.answers), 1):
+        stored = answer_key.get(normalize_text(question.question), {})
+        options = stored.get("options") or []
+        correct_answer = stored.get("answer")
+
+        if options and correct_answer:
+            score = 10 if is_correct_mcq(answer, correct_answer, options) else 0
+            question_results[i] = {"type": "MCQ", "score": score}
+            continue
+
+        check = code_checks.get(i)
+        if check:
+            correctness = round(get_resources().settings.code_correctness_points * check["passed"] / check["total"])
+            question_results[i] = {
+                "type": "Coding",
+                "score": correctness,
+                "correctness": correctness,
+                "feedback": f"{check['passed']}/{check['total']} test cases passed"
+            }
+            logger.info(f"🧪 Q{i}: {check['passed']}/{check['total']} test cases passed")
+        llm_items.append((i, question, answer))
+
+    # Identical (question, answer) pairs seen before reuse their stored model score
+    cache_keys = {i: cache_key_for(question, answer, code_checks, i) for i, question, answer in llm_items}
+    cached = await lookup_evaluations(list(cache_keys.values()))
+    if cached:
+        for i, question, _ in llm_items:
+            entry = cached.get(cache_keys[i])
+            if entry:
+                apply_model_score(question_results, i, question, entry["score"], entry["feedback"], code_checks)
+        llm_items = [item for item in llm_items if cache_keys[item[0]] not in cached]
+        logger.info(f"♻️ Reused {len(cache_keys) - len(llm_items)} cached evaluations")
+
+    if not llm_items:
+        logger.info(f"✅ Graded {len(question_results)} questions without a model call")
+        return build_result(question_results, max_score, parse_strategy="cache" if cached else "local")
+
+    logger.info(f"🧮 Scoring {len(llm_items)} questions with the model")
+
+    # Merge every batch that came back; scores from good batches are cached even if
+    # another batch failed, so the retry only pays for the failed ones. Questions a
+    # batch left unscored (truncated or malformed reply) are asked for again on their own.
+    new_entries, strategies, failure = {}, [], None
+    pending, rounds = llm_items, 1 + get_resources().settings.evaluation_rescore_rounds
+    for round_number in range(rounds):
+        missing, totals = [], []
+        for batch, outcome in await score_items(pending, code_checks):
+            if isinstance(outcome, BaseException):
+                failure = failure or outcome
+                continue
+            strategies.append(outcome["strategy"])
+            for item in batch:
+                i, question, _ = item
+                if i in outcome["scores"]:
+                    feedback = outcome["feedback"].get(i, "")
+                    apply_model_score(question_results, i, question, outcome["scores"][i], feedback, code_checks)
+                    new_entries[cache_keys[i]] = {"score": outcome["scores"][i], "feedback": feedback}
+                else:
+                    missing.append(item)
+            if outcome["strategy"] == "total":
+                totals.append((batch, outcome["total"]))
+        if failure is not None or not missing:
+            break
+        if round_number + 1 < rounds:
+            logger.info(f"🔁 Re-requesting scores for Q{', Q'.join(str(i) for i, _, _ in missing)}")
+            pending = missing
+    await store_evaluations(new_entries)
+
+    if failure is not None:
+        return batch_failure_result(question_results, max_score, failure)
+
+    # Last resort for a reply that only gave a total: it stands in for the whole batch,
+    # which only works when no question in it already has test-case points
+    unattributed = 0
+    for batch, total in totals:
+        if not any(i in code_checks for i, _, _ in batch):
+            unattributed += total
+            covered = {i for i, _, _ in batch}
+            missing = [item for item in missing if item[0] not in covered]
+
+    if missing:
+        # Retryable, so the evaluation queue asks again instead of recording 0 for these
+        numbers = ", ".join(f"Q{i}" for i, _, _ in missing)
+        logger.warning(f"⚠️ Model returned no score for {numbers}")
+        return failed_result(question_results, max_score, "Evaluation failed", f"No score returned for {numbers}")
+    return build_result(question_results, max_score, unattributed, weakest_strategy(strategies))
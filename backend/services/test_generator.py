@@ -1,20 +1,27 @@
-import os
 import json
-import httpx
-from dotenv import load_dotenv
+import math
+import asyncio
+from resources import get_resources
 from schemas.test_schemas import TestRequest
+from services.question_bank import question_kind, take_questions, store_questions
+from services.model_router import call_with_fallback, get_breaker
+from services.openrouter import RateLimited, post_chat, stream_chat
+from utils.text_utils import normalize_text
+from utils.json_stream import JSONArrayStreamParser
+from utils.metrics import mock_data_total
+from utils.log import get_logger, log_payload
 
-load_dotenv()
+logger = get_logger(__name__)
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-
-async def call_model(model_name: str, prompt: str):
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",  # Required for OpenRouter
+def openrouter_headers() -> dict:
+    return {
+        "Authorization": f"Bearer {get_resources().settings.openrouter_api_key}",  # Required for OpenRouter
         "Content-Type": "application/json",
     }
 
+async def call_model(model_name: str, prompt: str):
+    headers = openrouter_headers()
+
     body = {
         "model": model_name,
         "messages": [
@@ -24,90 +31,380 @@ async def call_model(model_name: str, prompt: str):
     }
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=body)
-            print(f"🔵 {model_name} | Status:", response.status_code)
-            print("🔵 Response preview:", response.text[:200])
+        response = await post_chat(body, headers)
+        logger.info(f"🔵 {model_name} | Status: {response.status_code}")
+        log_payload(logger, "🔵 Response preview", response.text[:200])
 
-            response.raise_for_status()
+        response.raise_for_status()
 
-            content = response.json()
-            ai_text = content["choices"][0]["message"]["content"].strip()
-            return json.loads(ai_text)
+        content = response.json()
+        ai_text = content["choices"][0]["message"]["content"].strip()
+        return json.loads(ai_text)
 
+    except RateLimited:
+        raise  # Not the model's fault; the router must not count it against the breaker
     except Exception as e:
-        print(f"❌ {model_name} failed:", e)
+        logger.error(f"❌ {model_name} failed: {e}")
         return None
 
-async def fetch_job_summary(jd_id: str):
-    """Fetch job summary using the provided job description ID"""
+async def stream_model(model_name: str, prompt: str):
+    """Stream a completion and yield each question object as soon as it is complete"""
+    body = {
+        "model": model_name,
+        "messages": [
+            {"role": "system", "content": "You are a JSON-generating assistant."},
+            {"role": "user", "content": prompt},
+        ],
+        "stream": True,
+    }
+
+    parser = JSONArrayStreamParser()
+    async with stream_chat(body, openrouter_headers()) as response:
+        logger.info(f"🔵 {model_name} (stream) | Status: {response.status_code}")
+        response.raise_for_status()
+
+        async for line in response.aiter_lines():
+            # SSE frames look like "data: {...}"; lines starting with ":" are keep-alive comments
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+
+            choices = chunk.get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content") or ""
+            for item in parser.feed(delta):
+                yield item
+
+async def load_job_summary(jd_id: str):
+    """Fetch job summary from the JD service, bypassing the cache"""
     try:
-        JOB_SUMMARY_API_URL = f"http://localhost:5000/api/jd/get-jd-summary/{jd_id}"
-        async with httpx.AsyncClient() as client:
-            headers = {
-                "Content-Type": "application/json",  # No JWT needed now
-            }
-            response = await client.get(JOB_SUMMARY_API_URL, headers=headers)
-            print(f"🔵 Job Summary API | Status:", response.status_code)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("jobSummary")
+        resources = get_resources()
+        JOB_SUMMARY_API_URL = f"{resources.settings.job_summary_api_url.rstrip('/')}/{jd_id}"
+        client = resources.http
+        headers = {
+            "Content-Type": "application/json",  # No JWT needed now
+        }
+        response = await client.get(JOB_SUMMARY_API_URL, headers=headers, timeout=resources.settings.job_summary_timeout)
+        logger.info(f"🔵 Job Summary API | Status: {response.status_code}")
+        response.raise_for_status()
+        data = response.json()
+        return data.get("jobSummary")
     except Exception as e:
-        print(f"❌ Job Summary API failed:", e)
+        logger.error(f"❌ Job Summary API failed: {e}")
         return None
 
-async def generate_questions(request: TestRequest):
+async def fetch_job_summary(jd_id: str):
+    """Fetch job summary using the provided job description ID (cached, single-flight)"""
+    resources = get_resources()
+    settings = resources.settings
+    return await resources.job_summary_cache.get_or_load(
+        jd_id,
+        lambda: load_job_summary(jd_id),
+        # Failed lookups are kept only briefly so a JD service outage isn't retried on every call
+        ttl=lambda summary: settings.job_summary_cache_ttl if summary else settings.job_summary_negative_ttl
+    )
+
+def invalidate_job_summary(jd_id: str):
+    """Drop a cached summary, e.g. when the JD service reports that the JD changed"""
+    get_resources().job_summary_cache.invalidate(jd_id)
+
+def requested_counts(request: TestRequest) -> dict:
+    """How many MCQ and coding questions the request asks for"""
+    if request.question_type == "coding":
+        return {"mcq": 0, "coding": request.num_questions}
+    if request.question_type == "mixed":
+        mcq_count = request.mcq_count or 0
+        coding_count = request.coding_count or 0
+        if mcq_count + coding_count == 0:
+            mcq_count = request.num_questions // 2
+            coding_count = request.num_questions - mcq_count
+        return {"mcq": mcq_count, "coding": coding_count}
+    return {"mcq": request.num_questions, "coding": 0}
+
+# Coding questions carry stdin/stdout cases so answers can be checked by running them
+CODING_TEST_CASES_PROMPT = (
+    "a list of 3 objects with input (exact stdin text) and expected_output (exact stdout text) "
+    "for a program that reads from stdin and prints to stdout"
+)
+
+def build_prompt(topic: str, difficulty: str, mcq_count: int, coding_count: int) -> str:
+    if mcq_count and coding_count:
+        return (
+            f"Generate a mixed set of {mcq_count + coding_count} {difficulty} level questions "
+            f"based on the job summary: '{topic}'. Include exactly {mcq_count} multiple choice questions and "
+            f"{coding_count} coding questions.\n\n"
+            "Each MCQ should include: question, options (list of 4), and answer.\n"
+            "Each coding question should include: question, answer (code or logic), and "
+            f"test_cases ({CODING_TEST_CASES_PROMPT}).\n"
+            "Respond only with a JSON array of such objects."
+        )
+    if coding_count:
+        return (
+            f"Generate {coding_count} {difficulty} level coding questions "
+            f"based on the job summary: '{topic}'. Respond only as a JSON array of objects. "
+            "Each object should have: question (coding problem statement), answer (expected code/logic), "
+            f"test_cases ({CODING_TEST_CASES_PROMPT}). "
+            "Do NOT include explanations."
+        )
+    return (
+        f"Generate {mcq_count} {difficulty} level multiple choice questions "
+        f"based on the job summary: '{topic}'. "
+        "Respond only as a valid JSON array of objects. Each object should have: "
+        "question, options (list of 4), and answer."
+    )
+
+def as_question_list(result) -> list:
+    """Keep only well-formed question objects from a model response"""
+    if isinstance(result, dict):
+        result = result.get("questions", [])
+    if not isinstance(result, list):
+        return []
+    return [q for q in result if isinstance(q, dict) and q.get("question")]
+
+async def generate_from_model(prompt: str):
+    # Ordered model list with hedging and per-model circuit breakers
+    result = await call_with_fallback(call_model, prompt, validate=lambda r: bool(as_question_list(r)))
+    return as_question_list(result)
+
+def is_valid_question(kind: str, question: dict) -> bool:
+    options = question.get("options")
+    if kind == "mcq":
+        return isinstance(options, list) and len(options) >= 2 and bool(question.get("answer"))
+    if options:
+        return False
+    # Test cases are optional, but malformed ones are dropped rather than trusted
+    test_cases = question.get("test_cases")
+    if test_cases is not None and not (
+        isinstance(test_cases, list)
+        and all(isinstance(c, dict) and "expected_output" in c for c in test_cases)
+    ):
+        question.pop("test_cases")
+    return True
+
+def chunk_sizes(count: int, size: int) -> list:
+    return [min(size, count - start) for start in range(0, count, size)]
+
+async def generate_chunked(topic: str, difficulty: str, counts: dict, seen: set | None = None) -> dict:
+    """
+    Generate questions per kind in fixed-size chunks, concurrently.
+    Each chunk is validated on its own and merged with de-duplication by
+    normalized question text; only the shortfall left by failed or partial
+    chunks is requested again.
+    Returns: {"mcq": [...], "coding": [...]}
+    """
+    settings = get_resources().settings
+    chunk_size = settings.generation_chunk_size
+    seen = set(seen or ())
+    semaphore = asyncio.Semaphore(settings.generation_concurrency)
+    generated = {"mcq": [], "coding": []}
+    rejections = []
+
+    async def run_chunk(kind: str, size: int, batch: int, batches: int, avoid: list):
+        async with semaphore:
+            prompt = build_prompt(
+                topic,
+                difficulty,
+                size if kind == "mcq" else 0,
+                size if kind == "coding" else 0
+            )
+            # Steer parallel chunks apart so fewer questions are lost to de-duplication
+            if batches > 1:
+                prompt += f"\nThis is batch {batch} of {batches}; focus on different skills from the job summary than the other batches."
+            if avoid:
+                prompt += "\nDo NOT repeat any of these questions: " + json.dumps(avoid)
+            try:
+                questions = await generate_from_model(prompt)
+            except RateLimited as e:
+                rejections.append(e)
+                return kind, []
+            return kind, [q for q in questions if is_valid_question(kind, q)]
+
+    for attempt in range(1 + settings.generation_chunk_retries):
+        missing = {kind: counts.get(kind, 0) - len(generated[kind]) for kind in generated}
+        jobs = []
+        for kind, n in missing.items():
+            sizes = chunk_sizes(n, chunk_size) if n > 0 else []
+            avoid = [q["question"] for q in generated[kind]][-chunk_size * 2:] if attempt else []
+            jobs += [run_chunk(kind, size, i + 1, len(sizes), avoid) for i, size in enumerate(sizes)]
+        if not jobs:
+            break
+        if attempt:
+            logger.info(f"🔁 Retrying {len(jobs)} chunk(s) for {missing}")
+
+        for kind, questions in await asyncio.gather(*jobs):
+            for q in questions:
+                key = normalize_text(q["question"])
+                if key in seen or len(generated[kind]) >= counts[kind]:
+                    continue
+                seen.add(key)
+                generated[kind].append(q)
+
+        # Retrying straight into a full limiter only makes the queue longer
+        if rejections:
+            break
+
+    # Nothing at all because every model refused: report it rather than serving mock questions
+    if rejections and not any(generated.values()):
+        raise rejections[0]
+    return generated
+
+MOCK_QUESTIONS = [
+    {
+        "question": "Mock Question: What is Python?",
+        "options": ["A programming language", "A snake", "A car", "A song"],
+        "answer": "A programming language"
+    }
+]
+
+async def resolve_job_summary(request: TestRequest):
+    """
+    Fetch the job summary for the request's jd_id and store it as the topic.
+    Returns: (job_summary, use_bank)
+    """
     # Use the jd_id from the request to fetch job summary
     job_summary = None
     if request.jd_id:
         job_summary = await fetch_job_summary(request.jd_id)
+
+    # Only real summaries are banked; the mock one would mix unrelated JDs together.
+    # The bank is only filled by prefetched spares, so without prefetch it is skipped outright.
+    use_bank = bool(job_summary) and get_resources().settings.question_bank_prefetch > 0
     
     if not job_summary:
-        print("⚠️ Failed to fetch job summary, using fallback mock data")
+        logger.warning("⚠️ Failed to fetch job summary, using fallback mock data")
+        mock_data_total.inc("job_summary")
         job_summary = "Mock job summary: Python developer role requiring skills in web development and data analysis."
     
     request.topic = job_summary
+    return job_summary, use_bank
 
-    if request.question_type == "coding":
-        prompt = (
-            f"Generate {request.num_questions} {request.difficulty} level coding questions "
-            f"based on the job summary: '{request.topic}'. Respond only as a JSON array of objects. "
-            "Each object should have: question (coding problem statement), answer (expected code/logic). "
-            "Do NOT include explanations."
-        )
-    elif request.question_type == "mixed":
-        mcq_count = getattr(request, "mcq_count", request.num_questions // 2)
-        coding_count = getattr(request, "coding_count", request.num_questions - mcq_count)
+async def take_banked(job_summary: str, request: TestRequest, counts: dict) -> dict:
+    mcqs, codings = await asyncio.gather(
+        take_questions(job_summary, request.difficulty, "mcq", counts["mcq"]),
+        take_questions(job_summary, request.difficulty, "coding", counts["coding"])
+    )
+    logger.info(f"🏦 Question bank served {len(mcqs)} MCQ / {len(codings)} coding")
+    return {"mcq": mcqs, "coding": codings}
 
-        prompt = (
-            f"Generate a mixed set of {mcq_count + coding_count} {request.difficulty} level questions "
-            f"based on the job summary: '{request.topic}'. Include exactly {mcq_count} multiple choice questions and "
-            f"{coding_count} coding questions.\n\n"
-            "Each MCQ should include: question, options (list of 4), and answer.\n"
-            "Each coding question should include: question and answer (code or logic).\n"
-            "Respond only with a JSON array of such objects."
-        )
-    else:
-        prompt = (
-            f"Generate {request.num_questions} {request.difficulty} level multiple choice questions "
-            f"based on the job summary: '{request.topic}'. "
-            "Respond only as a valid JSON array of objects. Each object should have: "
-            "question, options (list of 4), and answer."
-        )
+async def generate_questions(request: TestRequest):
+    job_summary, use_bank = await resolve_job_summary(request)
+    counts = requested_counts(request)
+
+    # Serve what we can from the question bank, unless the caller asked for fresh questions
+    banked = {"mcq": [], "coding": []}
+    if use_bank and not request.fresh:
+        banked = await take_banked(job_summary, request, counts)
+
+    shortfall = {kind: counts[kind] - len(banked[kind]) for kind in counts}
+
+    # Only the shortfall goes to the model, plus spares to bank if question_bank_prefetch is set
+    generated = {"mcq": [], "coding": []}
+    if any(n > 0 for n in shortfall.values()):
+        # Extra questions generated per shortfall (as a fraction) and banked for later regenerates
+        prefetch = get_resources().settings.question_bank_prefetch if use_bank else 0
+        to_generate = {
+            kind: n + math.ceil(n * prefetch) if n > 0 else 0
+            for kind, n in shortfall.items()
+        }
+        seen = {normalize_text(q["question"]) for kind in banked for q in banked[kind]}
+        generated = await generate_chunked(request.topic, request.difficulty, to_generate, seen)
+
+    questions, spare = [], []
+    for kind in ("mcq", "coding"):
+        fresh_questions = generated[kind][:max(shortfall[kind], 0)]
+        spare += generated[kind][len(fresh_questions):]
+        questions += banked[kind] + fresh_questions
+
+    if use_bank:
+        await store_questions(job_summary, request.difficulty, spare)
+
+    if not questions:
+        mock_data_total.inc("questions")
+        questions = list(MOCK_QUESTIONS)
+
+    return questions
+
+async def stream_questions(request: TestRequest):
+    """
+    Yield questions one at a time as they become available: banked ones
+    first, then each object parsed out of a streamed completion. Whatever
+    the stream leaves missing (truncated tail, invalid items) is filled by
+    the chunked generator.
+    """
+    job_summary, use_bank = await resolve_job_summary(request)
+    counts = requested_counts(request)
+
+    banked = {"mcq": [], "coding": []}
+    if use_bank and not request.fresh:
+        banked = await take_banked(job_summary, request, counts)
+
+    seen = set()
+    for kind in ("mcq", "coding"):
+        for q in banked[kind]:
+            seen.add(normalize_text(q["question"]))
+            yield q
+
+    shortfall = {kind: counts[kind] - len(banked[kind]) for kind in counts}
+    generated = {"mcq": [], "coding": []}
+
+    def accept(q) -> bool:
+        kind = question_kind(q)
+        key = normalize_text(q.get("question"))
+        if not key or key in seen or not is_valid_question(kind, q) or len(generated[kind]) >= shortfall[kind]:
+            return False
+        seen.add(key)
+        generated[kind].append(q)
+        return True
+
+    if any(n > 0 for n in shortfall.values()):
+        prompt = build_prompt(request.topic, request.difficulty, max(shortfall["mcq"], 0), max(shortfall["coding"], 0))
+
+        # Stream from the first model whose circuit is closed; fall back to the next if it yields nothing
+        for model_name in get_resources().settings.openrouter_models:
+            breaker = get_breaker(model_name)
+            if not breaker.allow():
+                continue
 
-    result = await call_model("qwen/qwen3-coder:free", prompt)
+            produced = 0
+            outcome = None
+            try:
+                async for q in stream_model(model_name, prompt):
+                    if accept(q):
+                        produced += 1
+                        yield q
+                outcome = produced > 0
+            except RateLimited as e:
+                logger.warning(f"🚦 {model_name} stream rejected: {e}")
+                outcome = None if not produced else True
+            except Exception as e:
+                logger.error(f"❌ {model_name} stream failed: {e}")
+                outcome = produced > 0
+            finally:
+                if outcome is None:
+                    breaker.release()  # client went away mid-stream
+                elif outcome:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
 
-    if not result:
-        print("⚠️ Falling back to mistralai/mistral-7b-instruct:free")
-        result = await call_model("mistralai/mistral-7b-instruct:free", prompt)
+            if produced:
+                break
 
-    if not result:
-        result = [
-            {
-                "question": "Mock Question: What is Python?",
-                "options": ["A programming language", "A snake", "A car", "A song"],
-                "answer": "A programming language"
-            }
-        ]
+        missing = {kind: shortfall[kind] - len(generated[kind]) for kind in generated}
+        if any(n > 0 for n in missing.values()):
+            logger.info(f"🔁 Stream left {missing} missing, filling with chunked generation")
+            filled = await generate_chunked(request.topic, request.difficulty, missing, seen)
+            for kind in ("mcq", "coding"):
+                for q in filled[kind]:
+                    generated[kind].append(q)
+                    yield q
 
-    return result
\ No newline at end of file
+    if not any(banked.values()) and not any(generated.values()):
+        mock_data_total.inc("questions")
+        for q in MOCK_QUESTIONS:
+            yield q
@@ -0,0 +1,65 @@
+from uuid import uuid4
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from db.supabase import get_supabase_client, run_query
+from schemas.test_schemas import Question
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+TEST_LINK_BASE = "http://localhost:5173/test/"
+
+
+def test_link(question_set_id: str) -> str:
+    return f"{TEST_LINK_BASE}{question_set_id}"
+
+
+async def finalize_question_set(questions: list[Question], duration: int, jd_id: str) -> dict:
+    """
+    Store a question set and its questions (two round trips); the set is
+    removed again if the questions can't be written.
+    Returns: {"test_id", "test_link", "questions_written"}
+    """
+    db = get_supabase_client()
+    question_set_id = str(uuid4())
+    created_at = datetime.utcnow()
+    expires_at = created_at + timedelta(hours=2)
+
+    # Insert into question_sets with duration
+    await run_query(db.table("question_sets").insert({
+        "id": question_set_id,
+        "jd_id": jd_id,
+        "created_at": created_at.isoformat(),
+        "expires_at": expires_at.isoformat(),
+        "duration": duration  # Add duration field
+    }))
+
+    # Build all question rows up front and write them in one batched insert
+    question_rows = [
+        {
+            "question_set_id": question_set_id,
+            "jd_id": jd_id,
+            "question": q.question,        # ✅ Access attributes
+            "options": q.options,          # ✅ Might be None
+            "answer": q.answer,            # ✅ Optional
+            "test_cases": jsonable_encoder(q.test_cases),  # Coding questions only
+            "created_at": created_at.isoformat(),
+            "expires_at": expires_at.isoformat()
+        }
+        for q in questions
+    ]
+
+    try:
+        result = await run_query(db.table("questions").insert(question_rows))
+    except Exception as e:
+        logger.error(f"❌ Error inserting questions, rolling back question set: {str(e)}")
+        # Roll back so a failed finalize never leaves a half-written set behind
+        await run_query(db.table("questions").delete().eq("question_set_id", question_set_id))
+        await run_query(db.table("question_sets").delete().eq("id", question_set_id))
+        raise
+
+    return {
+        "test_id": question_set_id,
+        "test_link": test_link(question_set_id),
+        "questions_written": len(result.data or [])
+    }
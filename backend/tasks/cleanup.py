@@ -1,6 +1,158 @@
-from db.supabase import supabase
-from datetime import datetime
+import time
+import random
+import asyncio
+from datetime import datetime, timedelta
+from db.supabase import get_supabase_client, run_query
+from utils.log import get_logger
+from resources import get_resources
 
-def delete_expired_tests():
-    now = datetime.utcnow().isoformat()
-    supabase.table("questions").delete().lt("expires_at", now).execute()
+logger = get_logger(__name__)
+
+cleanup_stats = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_duration_seconds": None,
+    "last_deleted": {},
+    "total_deleted": {"questions": 0, "test_results": 0, "question_sets": 0, "question_bank": 0},
+    "last_error": None
+}
+
+
+async def _delete_in_batches(table: str, build_select) -> int:
+    """
+    Select up to cleanup_batch_size ids with `build_select()` and delete them by id,
+    repeating until a short batch or cleanup_max_batches. Returns rows deleted.
+    """
+    settings = get_resources().settings
+    deleted = 0
+    for _ in range(settings.cleanup_max_batches):
+        res = await run_query(build_select().limit(settings.cleanup_batch_size))
+        ids = [row["id"] for row in res.data or []]
+        if not ids:
+            break
+        await run_query(get_supabase_client().table(table).delete().in_("id", ids))
+        deleted += len(ids)
+        if len(ids) < settings.cleanup_batch_size:
+            break
+    return deleted
+
+
+async def _delete_children(table: str, set_ids: list) -> int:
+    return await _delete_in_batches(
+        table,
+        lambda: get_supabase_client().table(table).select("id").in_("question_set_id", set_ids)
+    )
+
+
+async def delete_expired_tests() -> dict:
+    """
+    Delete expired data in bounded batches:
+      - questions whose set expired more than questions_grace_hours ago
+        (extend-expiry keeps questions.expires_at in step with the set's)
+      - test_results older than results_retention_days
+      - question sets expired more than results_retention_days ago (children first)
+      - banked questions already served (they are never read again)
+    Returns: {table: rows deleted}
+    """
+    settings = get_resources().settings
+    now = datetime.utcnow()
+    deleted = {"questions": 0, "test_results": 0, "question_sets": 0, "question_bank": 0}
+
+    questions_cutoff = (now - timedelta(hours=settings.questions_grace_hours)).isoformat()
+    deleted["questions"] += await _delete_in_batches(
+        "questions",
+        lambda: get_supabase_client().table("questions").select("id").lt("expires_at", questions_cutoff)
+    )
+
+    if settings.results_retention_days > 0:
+        retention_cutoff = (now - timedelta(days=settings.results_retention_days)).isoformat()
+        deleted["test_results"] += await _delete_in_batches(
+            "test_results",
+            lambda: get_supabase_client().table("test_results").select("id").lt("created_at", retention_cutoff)
+        )
+
+        for _ in range(settings.cleanup_max_batches):
+            res = await run_query(
+                get_supabase_client().table("question_sets").select("id")
+                .lt("expires_at", retention_cutoff)
+                .limit(settings.cleanup_batch_size)
+            )
+            set_ids = [row["id"] for row in res.data or []]
+            if not set_ids:
+                break
+            # Anything still pointing at these sets has to go first
+            deleted["test_results"] += await _delete_children("test_results", set_ids)
+            deleted["questions"] += await _delete_children("questions", set_ids)
+            await run_query(get_supabase_client().table("question_sets").delete().in_("id", set_ids))
+            deleted["question_sets"] += len(set_ids)
+            if len(set_ids) < settings.cleanup_batch_size:
+                break
+
+    served_before = now.isoformat()
+    deleted["question_bank"] += await _delete_in_batches(
+        "question_bank",
+        lambda: get_supabase_client().table("question_bank").select("id").lt("served_at", served_before)
+    )
+
+    return deleted
+
+
+async def run_cleanup() -> dict:
+    """One cleanup pass with timing and counters recorded in cleanup_stats"""
+    started = time.perf_counter()
+    try:
+        deleted = await delete_expired_tests()
+        cleanup_stats["last_error"] = None
+    except Exception as e:
+        logger.error(f"❌ Cleanup failed: {e}")
+        deleted = {}
+        cleanup_stats["last_error"] = str(e)
+
+    duration = time.perf_counter() - started
+    cleanup_stats["runs"] += 1
+    cleanup_stats["last_run_at"] = datetime.utcnow().isoformat()
+    cleanup_stats["last_duration_seconds"] = round(duration, 3)
+    cleanup_stats["last_deleted"] = deleted
+    for table, count in deleted.items():
+        cleanup_stats["total_deleted"][table] += count
+
+    if any(deleted.values()):
+        logger.info(f"🧹 Cleanup removed {deleted} in {duration:.2f}s")
+    return deleted
+
+
+class CleanupScheduler:
+    """
+    Runs run_cleanup() every cleanup_interval_seconds while the app is up. Each worker
+    also waits a random 0..cleanup_jitter_seconds so they don't all delete at once.
+    """
+
+    def __init__(self, interval: float | None = None, jitter: float | None = None):
+        self.interval = interval
+        self.jitter = jitter
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        settings = get_resources().settings
+        if self._task is None and settings.cleanup_enabled:
+            self._task = asyncio.create_task(self._loop(
+                settings.cleanup_interval_seconds if self.interval is None else self.interval,
+                settings.cleanup_jitter_seconds if self.jitter is None else self.jitter
+            ))
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self, interval: float, jitter: float):
+        delay = random.uniform(0, jitter)
+        while True:
+            await asyncio.sleep(delay)
+            await run_cleanup()
+            delay = interval + random.uniform(0, jitter)
+
+
+cleanup_scheduler = CleanupScheduler()
@@ -0,0 +1,66 @@
+import json
+
+
+class JSONArrayStreamParser:
+    """
+    Incrementally pull complete objects out of a JSON array as text arrives.
+
+    Anything before the opening '[' (e.g. a ```json fence) is ignored, each
+    top-level object is emitted as soon as its closing brace arrives, and an
+    object that never completes (or fails to parse) is simply dropped.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer: list[str] = []
+
+    def feed(self, text: str) -> list:
+        items = []
+        for ch in text:
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._depth >= 2:
+                self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 1 and ch == "{":
+                    self._buffer = [ch]
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and ch == "}":
+                    item = self._parse("".join(self._buffer))
+                    if item is not None:
+                        items.append(item)
+                    self._buffer = []
+                elif self._depth <= 0:
+                    # End of the array; ignore any trailing text
+                    self._started = False
+                    self._depth = 0
+        return items
+
+    @staticmethod
+    def _parse(raw: str):
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
@@ -0,0 +1,66 @@
+import sys
+import json
+import logging
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from config import Settings
+
+# Raw model output, response bodies etc. are only logged (at DEBUG) when settings.log_payloads is on
+_log_payloads = False
+
+# Set per HTTP request by the middleware in app.py and sent on outbound calls
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, request_id and any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = request_id_var.get()
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        request_id = request_id_var.get()
+        prefix = f"[{request_id}] " if request_id else ""
+        return f"{record.levelname:<7} {record.name}: {prefix}{super().format(record)}"
+
+
+def setup_logging(settings: Settings):
+    """Configure the root handler; safe to call again (e.g. from the lifespan or under uvicorn --reload)"""
+    global _log_payloads
+    _log_payloads = settings.log_payloads
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if settings.log_format.lower() == "json" else TextFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.log_level.upper())
+    # httpx logs every request at INFO; that is what the metrics are for
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def log_payload(logger: logging.Logger, message: str, payload):
+    """Log a potentially large body only when log_payloads is enabled"""
+    if _log_payloads and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, extra={"payload": payload})
@@ -0,0 +1,131 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Default latency buckets in seconds: DB calls sit at the low end, LLM calls at the high end
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, count in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, values)} {count}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_label_text(self.labels, values, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, values, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, values)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, values)} {series[-1]}")
+        return lines
+
+
+# Supabase round trips made while serving the current API request (a mutable
+# [count] set by the middleware, so tasks spawned by the request share it)
+db_round_trips_var: ContextVar[list | None] = ContextVar("db_round_trips", default=None)
+
+
+def count_db_round_trip():
+    counter = db_round_trips_var.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+# Hot-path latency
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "API request latency by route", ("method", "route", "status")
+)
+llm_request_seconds = Histogram(
+    "llm_request_duration_seconds", "OpenRouter call latency by model and outcome", ("model", "outcome")
+)
+db_query_seconds = Histogram(
+    "db_query_duration_seconds", "Supabase query latency by table and operation", ("table", "operation")
+)
+
+# Degraded paths
+model_fallbacks_total = Counter(
+    "model_fallbacks_total", "Times generation moved on to another model", ("model", "reason")
+)
+mock_data_total = Counter(
+    "mock_data_total", "Times mock data was served instead of real data", ("kind",)
+)
+score_parse_total = Counter(
+    "score_parse_strategy_total", "Evaluations by the strategy that parsed the model's scores", ("strategy",)
+)
+
+REGISTRY = [
+    http_request_seconds,
+    llm_request_seconds,
+    db_query_seconds,
+    model_fallbacks_total,
+    mock_data_total,
+    score_parse_total,
+]
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
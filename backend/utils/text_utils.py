@@ -0,0 +1,8 @@
+def normalize_text(text) -> str:
+    """Lowercase and collapse whitespace so stored and submitted text compare cleanly"""
+    return " ".join(str(text or "").split()).lower()
+
+
+def estimate_tokens(text) -> int:
+    """Rough token count (~4 characters per token for English and code); no tokenizer needed"""
+    return len(str(text or "")) // 4 + 1
@@ -11,6 +11,78 @@ export const generateTest = async (formData) => {
   return await response.json();
 };
 
+// Streams questions over Server-Sent Events; onQuestion fires for each one as it arrives
+export const generateTestStream = async (formData, onQuestion) => {
+  const response = await fetch(`${BASE_URL}/api/hr/generate-test/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(formData),
+  });
+  if (!response.ok || !response.body) throw new Error('Failed to generate test');
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const questions = [];
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = raw.match(/^data: (.*)$/m)?.[1];
+      if (!data) continue;
+      if (event === 'question') {
+        const question = JSON.parse(data);
+        questions.push(question);
+        onQuestion?.(question, questions.length);
+      } else if (event === 'error') {
+        throw new Error(JSON.parse(data).detail || 'Failed to generate test');
+      }
+    }
+  }
+  return { questions };
+};
+
+// Generates and finalizes one test per JD; onProgress fires on every JD stage change
+// (queued, generating, finalizing, done, failed). Resolves with the campaign summary.
+export const createCampaign = async (campaignData, onProgress) => {
+  const response = await fetch(`${BASE_URL}/api/hr/campaigns/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(campaignData),
+  });
+  if (!response.ok || !response.body) throw new Error('Failed to create campaign');
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = raw.match(/^data: (.*)$/m)?.[1];
+      if (!data) continue;
+      if (event === 'progress') {
+        onProgress?.(JSON.parse(data));
+      } else if (event === 'done') {
+        return JSON.parse(data);
+      }
+    }
+  }
+  throw new Error('Campaign stream ended early');
+};
+
 export const finalizeTest = async (data) => {
   // Handle both old format (just questions) and new format (questions + duration)
   console.log("data---->",data);
@@ -32,19 +104,31 @@ export const finalizeTest = async (data) => {
 };
 
 // Get all tests (for HR dashboard)
-export const getAllTests = async () => {
-  const response = await fetch(`${BASE_URL}/api/hr/tests`);
+// Pass { limit, after, active_only } to page through; use next_cursor from the response as `after`
+export const getAllTests = async (params = {}) => {
+  const query = new URLSearchParams(params).toString();
+  const response = await fetch(`${BASE_URL}/api/hr/tests${query ? `?${query}` : ''}`);
   if (!response.ok) throw new Error('Failed to fetch tests');
   return await response.json();
 };
 
 // Get test results (for HR to view submissions)
-export const getTestResults = async (testId) => {
-  const response = await fetch(`${BASE_URL}/api/hr/tests/${testId}/results`);
+// Pass { limit, after, fields, include_summary }; raw_feedback is only returned when listed in `fields`
+export const getTestResults = async (testId, params = {}) => {
+  const query = new URLSearchParams(params).toString();
+  const response = await fetch(`${BASE_URL}/api/hr/tests/${testId}/results${query ? `?${query}` : ''}`);
   if (!response.ok) throw new Error('Failed to fetch test results');
   return await response.json();
 };
 
+// Download URLs for streamed exports; params: { format: 'csv' | 'ndjson', fields, gzip }
+// and, for all tests, { since, until }. Use as an <a href> so the browser saves the file.
+export const getResultsExportUrl = (testId, params = {}) => {
+  const query = new URLSearchParams(params).toString();
+  const path = testId ? `/api/hr/tests/${testId}/results/export` : '/api/hr/results/export';
+  return `${BASE_URL}${path}${query ? `?${query}` : ''}`;
+};
+
 // Candidate Endpoints
 export const fetchTest = async (questionSetId) => {
   const response = await fetch(`${BASE_URL}/api/test/${questionSetId}`);
@@ -52,16 +136,38 @@ export const fetchTest = async (questionSetId) => {
   return await response.json();
 };
 
-export const submitTest = async (submissionData) => {
+// Pass the same idempotencyKey when retrying a submission so it is stored and evaluated once
+export const submitTest = async (submissionData, idempotencyKey) => {
+  const headers = { 'Content-Type': 'application/json' };
+  if (idempotencyKey) headers['Idempotency-Key'] = idempotencyKey;
   const response = await fetch(`${BASE_URL}/api/test/submit`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers,
     body: JSON.stringify(submissionData),
   });
   if (!response.ok) throw new Error('Failed to submit test');
   return await response.json();
 };
 
+// Submissions are scored in the background; poll until evaluation finishes
+export const getSubmissionResult = async (resultId) => {
+  const response = await fetch(`${BASE_URL}/api/test/results/${resultId}`);
+  if (!response.ok) throw new Error('Failed to fetch submission result');
+  return await response.json();
+};
+
+export const waitForResult = async (resultId, { intervalMs = 2000, timeoutMs = 180000 } = {}) => {
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    const result = await getSubmissionResult(resultId);
+    if (result.evaluation_status === 'done' || result.evaluation_status === 'failed') {
+      return result;
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+  throw new Error('Evaluation is taking longer than expected');
+};
+
 // Utility functions
 export const extractTestIdFromUrl = (url) => {
   try {
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { FileText, AlertCircle, Target, Hash, Zap, Award, Layers } from 'lucide-react';
-import { generateTest } from '../api';
+import { generateTestStream } from '../api';
 
 const GenerateTest = ({ onNavigate, onDataPass, jdId }) => {
   const [formData, setFormData] = useState({
@@ -13,6 +13,7 @@ const GenerateTest = ({ onNavigate, onDataPass, jdId }) => {
   const [mcqCount, setMcqCount] = useState('');
   const [codingCount, setCodingCount] = useState('');
   const [loading, setLoading] = useState(false);
+  const [generatedCount, setGeneratedCount] = useState(0);
   const [jobSummaryLoading, setJobSummaryLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -66,6 +67,7 @@ const GenerateTest = ({ onNavigate, onDataPass, jdId }) => {
   const handleSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
+    setGeneratedCount(0);
     setError('');
     try {
       const finalFormData = { ...formData };
@@ -81,7 +83,7 @@ const GenerateTest = ({ onNavigate, onDataPass, jdId }) => {
 
       console.log('Sending form data with jd_id:', finalFormData.jd_id); // Debug log
 
-      const data = await generateTest(finalFormData);
+      const data = await generateTestStream(finalFormData, (_, count) => setGeneratedCount(count));
       onNavigate('finalize', data.questions); // Navigate + pass questions
     } catch (err) {
       setError('Failed to generate test.');
@@ -346,7 +348,10 @@ const GenerateTest = ({ onNavigate, onDataPass, jdId }) => {
                   {loading ? (
                     <>
                       <div className="animate-spin rounded-full h-5 w-5 border-2 border-white border-t-transparent mr-3"></div>
-                      <span>Generating Assessment...</span>
+                      <span>
+                        Generating Assessment...
+                        {generatedCount > 0 && ` (${generatedCount}/${formData.question_type === 'mixed' ? (parseInt(mcqCount) || 0) + (parseInt(codingCount) || 0) : formData.num_questions})`}
+                      </span>
                     </>
                   ) : (
                     <span>Generate Assessment</span>
@@ -1,7 +1,7 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Clock, AlertCircle, CheckCircle, Code, Play, Loader } from 'lucide-react';
 import MonacoEditor from '@monaco-editor/react';
-import { submitTest } from '../api';
+import { submitTest, waitForResult } from '../api';
 import axios from 'axios';
 
 const JUDGE0_API_KEY = import.meta.env.VITE_JUDGE0_API_KEY;
@@ -80,6 +80,8 @@ const GiveTest = ({ testQuestions, testDuration, questionSetId, onNavigate }) =>
   const [timeLeft, setTimeLeft] = useState(null); // Will be set based on testDuration
   const [submitted, setSubmitted] = useState(false);
   const [submitting, setSubmitting] = useState(false);
+  // One key per sitting: double-clicks and retries after a timeout reuse it
+  const submissionKey = useRef(crypto.randomUUID());
   const [result, setResult] = useState(null);
   const [outputs, setOutputs] = useState({});
   const [runningCode, setRunningCode] = useState({});
@@ -283,7 +285,8 @@ const GiveTest = ({ testQuestions, testDuration, questionSetId, onNavigate }) =>
         duration_used: (testDuration * 60) - timeLeft // Calculate time used in seconds
       };
 
-      const result = await submitTest(data);
+      const submission = await submitTest(data, submissionKey.current);
+      const result = await waitForResult(submission.result_id);
       setResult(result);
       setSubmitted(true);
     } catch (err) {